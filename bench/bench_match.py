@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Compares the recursive, push-back command matcher glue.py used to have
+with CommandTrie, on phrases that hit and miss the CODE_EXPANSIONS table.
+
+usage: python bench/bench_match.py [repeat count]
+"""
+from __future__ import print_function
+
+import collections
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import glue
+
+try:
+    basestring
+except NameError:
+    # python 3
+    basestring = str
+
+PHRASES = [
+    ('hit, one word', ['plus', ' ', 'foo']),
+    ('hit, two words', ['greater', ' ', 'than', ' ', 'foo']),
+    ('hit, three words', ['triple', ' ', 'not', ' ', 'equals', ' ', 'foo']),
+    ('miss, not a command', ['foo', ' ', 'bar']),
+    ('miss, near miss', ['greater', ' ', 'foo', ' ', 'bar']),
+    ('miss, deep near miss', ['triple', ' ', 'not', ' ', 'foo', ' ', 'bar']),
+]
+
+
+class LegacyMatcher(object):
+    """The old Keypresser.match_command, reading from a fragment list."""
+
+    def __init__(self, fragments):
+        self._words_in = iter(fragments)
+        self._words_queued = []
+
+    def next_input_fragment(self):
+        if len(self._words_queued):
+            return self._words_queued.pop()
+        return next(self._words_in)
+
+    def push_back_fragment(self, frag):
+        self._words_queued.append(frag)
+
+    def emit_keypresses(self, keys):
+        pass
+
+    def match_command(self, word, command_tree, strip_spaces_from_keypresses=False):
+        if word in command_tree:
+            if isinstance(command_tree[word], dict):
+                _space = self.next_input_fragment()
+                next_word = self.next_input_fragment()
+                if self.match_command(next_word.lower(), command_tree[word], strip_spaces_from_keypresses):
+                    return True
+                else:
+                    self.push_back_fragment(next_word)
+                    self.push_back_fragment(_space)
+                    return False
+            elif isinstance(command_tree[word], basestring):
+                if strip_spaces_from_keypresses:
+                    cmd = command_tree[word].strip()
+                else:
+                    cmd = command_tree[word]
+                self.emit_keypresses(cmd)
+                return True
+            else:
+                command_tree[word]()
+                return True
+
+
+class TrieMatcher(object):
+    """CommandTrie matching with Keypresser's read-ahead queue."""
+
+    def __init__(self, fragments):
+        self._words_in = iter(fragments)
+        self._words_queued = collections.deque()
+
+    next_input_fragment = glue.Keypresser.__dict__['next_input_fragment']
+    find_command = glue.Keypresser.__dict__['find_command']
+    match_command = glue.Keypresser.__dict__['match_command']
+
+    def emit_keypresses(self, keys):
+        pass
+
+
+def run(matcher_class, commands, fragments, repeat):
+    """
+    Offers every word of the phrase, repeated, to the matcher as glue does.
+    Returns the best time of three runs.
+    """
+    times = []
+    for i in range(3):
+        matcher = matcher_class(fragments * repeat)
+        start = time.time()
+        try:
+            while True:
+                word = matcher.next_input_fragment()
+                if word != ' ':
+                    matcher.match_command(word.lower(), commands)
+        except StopIteration:
+            pass
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    expansions = glue.CommandTrie(glue.CODE_EXPANSIONS)
+    print('{0:<24} {1:>14} {2:>14}'.format('phrase', 'legacy phr/sec', 'trie phr/sec'))
+    for name, fragments in PHRASES:
+        legacy = run(LegacyMatcher, glue.CODE_EXPANSIONS, fragments, repeat)
+        trie = run(TrieMatcher, expansions, fragments, repeat)
+        print('{0:<24} {1:>14.0f} {2:>14.0f}'.format(name, repeat / legacy, repeat / trie))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Measures the memory ModeCode.parse allocates per word, using tracemalloc
+(python 3.9 or later), on a recorded dragon byte stream.
+
+usage: python bench/bench_parse.py [stream file]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import glue
+from pykeyboard.recording import NullKeyboard
+
+STREAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streams')
+
+
+class MeasuredModeCode(glue.ModeCode):
+    """Records the peak memory allocated while parsing each word."""
+
+    peaks = []
+
+    def parse(self, word):
+        if word == ' ' or self.peaks is None:
+            return super(MeasuredModeCode, self).parse(word)
+        # only the outermost call, not parse()'s recursion on symbols
+        peaks, self.peaks = self.peaks, None
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        super(MeasuredModeCode, self).parse(word)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        self.peaks = peaks
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(STREAMS_DIR, 'dictation.txt')
+    with open(path, 'rb') as f:
+        data = f.read().decode('latin-1')
+    tokenizer = glue.WordTokenizer()
+    fragments = tokenizer.feed(data) + tokenizer.flush()
+
+    keypresser = glue.Keypresser(kb=NullKeyboard(), fragments=fragments)
+    keypresser.mode_code = MeasuredModeCode(keypresser)
+    keypresser.current_mode = keypresser.mode_code
+
+    glue.log.stream = open(os.devnull, 'w')
+    tracemalloc.start()
+    try:
+        keypresser.loop()
+    finally:
+        tracemalloc.stop()
+
+    peaks = sorted(MeasuredModeCode.peaks)
+    print('{0} words parsed'.format(len(peaks)))
+    print('peak bytes allocated per word: mean {0:.0f}, median {1}, max {2}'.format(
+        float(sum(peaks)) / len(peaks), peaks[len(peaks) // 2], peaks[-1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Compares the per-character stdin reader glue.py used to have with the
+bulk-read WordTokenizer, on a recorded dragon byte stream.
+
+usage: python bench/bench_reader.py [stream file] [repeat count]
+"""
+from __future__ import print_function
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import glue
+
+STREAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streams')
+
+
+def legacy_words(read):
+    """The old input_word_generator loop: one read(1) call per character."""
+    NON_SPLITTERS = "-'"
+    word = ''
+    while True:
+        char = read(1)
+        if char == '':
+            if word:
+                yield word
+            return
+        if char == '\x1b':
+            word += char
+            while word[-1] != '~':
+                word += read(1)
+            yield(word)
+            word = ''
+        elif char == '\r' or char == '\n':
+            yield(word)
+            yield('\n')
+            word = ''
+        elif char == ' ':
+            yield(word)
+            yield(' ')
+            word = ''
+        elif len(word)>0 and char not in NON_SPLITTERS and char.isalpha() != word[0].isalpha():
+            yield(word)
+            word = char
+        else:
+            word += char
+
+
+def tokenizer_words(data, chunk_size=4096):
+    """The current reader: os.read() sized chunks fed to a WordTokenizer."""
+    tokenizer = glue.WordTokenizer()
+    for i in range(0, len(data), chunk_size):
+        for fragment in tokenizer.feed(data[i:i+chunk_size]):
+            yield fragment
+    for fragment in tokenizer.flush():
+        yield fragment
+
+
+def timed(name, make_words):
+    start = time.time()
+    words = [w for w in make_words() if w not in ('', ' ')]
+    elapsed = time.time() - start
+    print('{0:<10} {1:>8} words  {2:8.3f}s  {3:>12.0f} words/sec'.format(
+        name, len(words), elapsed, len(words) / elapsed))
+    return words
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(STREAMS_DIR, 'dictation.txt')
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    with open(path, 'rb') as f:
+        data = f.read().decode('latin-1') * repeat
+
+    legacy = timed('read(1)', lambda: legacy_words(io.StringIO(data).read))
+    bulk = timed('tokenizer', lambda: tokenizer_words(data))
+    if legacy != bulk:
+        print('WARNING: readers disagree on the word stream')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Counts the XTEST events and X server round trips glue makes to type some
+identifiers, with and without batching (which also holds Shift down over
+runs of shifted characters), using the X11 PyKeyboard on a
+stub Display (so no X server is needed, but python-xlib is).
+
+usage: python bench/bench_x11.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import glue
+import pykeyboard.x11
+
+IDENTIFIERS = [
+    'self.parent_of_node = None',
+    'parentOfNode',
+    'SELECT STAR FROM TABLE ',
+    'MAX_RETRY_COUNT',
+    '<BS>' * 40,
+]
+
+
+class StubDisplay(object):
+    """Counts requests and round trips instead of talking to an X server."""
+
+    def __init__(self, display=None):
+        self.requests = 0
+        self.round_trips = 0
+
+    def has_extension(self, extension):
+        return True
+
+    def keysym_to_keycode(self, keysym):
+        return 8 + keysym % 248
+
+    def flush(self):
+        pass
+
+    def pending_events(self):
+        return 0
+
+    def sync(self):
+        self.round_trips += 1
+
+
+def stub_fake_input(display, event_type, detail):
+    display.requests += 1
+
+
+def main():
+    pykeyboard.x11.Display = StubDisplay
+    pykeyboard.x11.fake_input = stub_fake_input
+    kb = pykeyboard.x11.PyKeyboard()
+    keypresser = glue.Keypresser(kb=kb, fragments=[])
+
+    def count(send, keys):
+        kb.display.requests = kb.display.round_trips = 0
+        send(keys)
+        return kb.display.requests, kb.display.round_trips
+
+    def emit_utterance(keys):
+        keypresser.emit_keypresses(keys)
+        keypresser.flush_keypresses()
+
+    glue.log.stream = open(os.devnull, 'w')
+    results = []
+    for keys in IDENTIFIERS:
+        # emit_key_events() on its own syncs after every key (or run of a key)
+        unbatched = count(keypresser.emit_key_events, glue.parse_keypresses(keys))
+        batched = count(emit_utterance, keys)
+        results.append((keys, unbatched, batched))
+
+    print('{0:<28} {1:>17} {2:>15} {3:>16} {4:>14}'.format(
+        'keys', 'unbatched events', 'batched events', 'unbatched syncs', 'batched syncs'))
+    for keys, unbatched, batched in results:
+        print('{0:<28} {1:>17} {2:>15} {3:>16} {4:>14}'.format(
+            repr(keys)[:28], unbatched[0], batched[0], unbatched[1], batched[1]))
+
+
+if __name__ == '__main__':
+    main()
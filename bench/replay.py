@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+End to end benchmark of the glue pipeline. Replays recorded dragon byte
+streams through a pipe into input_word_generator, Keypresser.loop and the
+speech modes, typing into a recording keyboard rather than X, and reports
+for each stream:
+
+ * words/sec through the whole pipeline
+ * p50/p99 per-word latency: the time glue spends between taking a
+   fragment from the reader and asking for the next one
+ * bytes allocated per word (peak, with tracemalloc on python 3.9+)
+ * key events injected
+ * utterances: the empty fragments the reader ended utterances with
+
+By default each stream is written in one go, as fast as glue can take it,
+which makes it all one utterance. With --live, it is written the way a
+terminal hands over dragon's typing: a few bytes at a time, with a pause
+after each utterance (each \r in the stream), so the reader has to find
+where utterances end. That is slow, so words/sec is then the words over the
+time glue spent on them rather than the time taken.
+
+usage: python bench/replay.py [-n repeat count] [--live] [stream file...]
+"""
+from __future__ import print_function
+
+import glob
+import optparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import glue
+from pykeyboard.recording import RecordingKeyboard
+
+try:
+    import tracemalloc
+    tracemalloc.reset_peak
+except (ImportError, AttributeError):
+    tracemalloc = None
+
+STREAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streams')
+
+# how --live writes streams: bytes per write, and seconds between writes and
+# after an utterance (longer than the reader waits for an utterance to end)
+LIVE_CHUNK = 4
+LIVE_CHUNK_GAP = 0.002
+LIVE_UTTERANCE_GAP = glue.UTTERANCE_TIMEOUT + 0.1
+
+
+class MeasuredFragments(object):
+    """
+    Wraps the reader, timing (and optionally measuring the memory allocated
+    by) the processing of each fragment: from when it is handed out to when
+    the next fragment is asked for.
+    """
+
+    def __init__(self, fragments, measure_memory):
+        self.fragments = iter(fragments)
+        self.measure_memory = measure_memory
+        self.latencies = []
+        self.allocations = []
+        self.utterances = 0
+        # total time spent on fragments
+        self.busy = 0
+        self._last = None
+        self._last_time = None
+        self._last_memory = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        now = time.time()
+        if self.measure_memory:
+            current, peak = tracemalloc.get_traced_memory()
+        if self._last is not None:
+            self.busy += now - self._last_time
+        if self._last == '':
+            self.utterances += 1
+        if self._last not in (None, ' ', ''):
+            self.latencies.append(now - self._last_time)
+            if self.measure_memory:
+                self.allocations.append(peak - self._last_memory)
+        elif self._last == '' and self.latencies:
+            # the end of an utterance, when its keys are injected. count
+            # that against the utterance's last word
+            self.latencies[-1] += now - self._last_time
+        # don't count time spent blocked in the reader
+        self._last = next(self.fragments)
+        if self.measure_memory:
+            tracemalloc.reset_peak()
+            self._last_memory = tracemalloc.get_traced_memory()[0]
+        self._last_time = time.time()
+        return self._last
+
+    next = __next__
+
+
+def write_live(fd, data):
+    """Writes data to fd as a terminal would pass on dragon's typing."""
+    for utterance in data.splitlines(True):
+        for i in range(0, len(utterance), LIVE_CHUNK):
+            os.write(fd, utterance[i:i + LIVE_CHUNK])
+            time.sleep(LIVE_CHUNK_GAP)
+        time.sleep(LIVE_UTTERANCE_GAP)
+
+
+def replay(data, measure_memory=False, live=False):
+    """Runs data through the pipeline, returning the MeasuredFragments and keyboard."""
+    read_fd, write_fd = os.pipe()
+
+    def write():
+        if live:
+            write_live(write_fd, data)
+        else:
+            os.write(write_fd, data)
+        os.close(write_fd)
+    writer = threading.Thread(target=write)
+    writer.start()
+
+    fragments = MeasuredFragments(glue.input_word_generator(read_fd), measure_memory)
+    kb = RecordingKeyboard()
+    keypresser = glue.Keypresser(kb=kb, fragments=fragments)
+
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        start = time.time()
+        keypresser.loop()
+        elapsed = time.time() - start
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+        writer.join()
+        os.close(read_fd)
+    return fragments, kb, elapsed
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [-n repeat count] [--live] [stream file...]')
+    parser.add_option('-n', '--repeat', type='int', default=20,
+                      help='times to repeat each stream [default: %default]')
+    parser.add_option('--live', action='store_true',
+                      help='write streams a few bytes at a time, pausing after each '
+                           'utterance, as a terminal would')
+    options, paths = parser.parse_args()
+    glue.log.stream = open(os.devnull, 'w')
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(STREAMS_DIR, '*.txt')))
+
+    print('{0:<16} {1:>7} {2:>10} {3:>9} {4:>9} {5:>12} {6:>8} {7:>10}'.format(
+        'stream', 'words', 'words/sec', 'p50 us', 'p99 us', 'bytes/word', 'events',
+        'utterances'))
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read() * options.repeat
+
+        fragments, kb, elapsed = replay(data, live=options.live)
+        words = len(fragments.latencies)
+        if options.live:
+            elapsed = fragments.busy
+        allocated = ''
+        if tracemalloc is not None and not options.live:
+            measured = replay(data, measure_memory=True)[0]
+            allocated = '{0:.0f}'.format(float(sum(measured.allocations)) / len(measured.allocations))
+
+        print('{0:<16} {1:>7} {2:>10.0f} {3:>9.1f} {4:>9.1f} {5:>12} {6:>8} {7:>10}'.format(
+            os.path.basename(path)[:16], words, words / elapsed,
+            percentile(fragments.latencies, 0.5) * 1e6,
+            percentile(fragments.latencies, 0.99) * 1e6,
+            allocated, len(kb.events), fragments.utterances))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,49 @@
 #!/usr/bin/env python
 from __future__ import print_function
 
-import pykeyboard
 import re
 import sys
 import os
 import functools
+import collections
+from array import array
+import json
+import time
+import threading
+import importlib
+
+try:
+    import queue
+except ImportError:
+    # python 2
+    import Queue as queue
+
+try:
+    basestring
+except NameError:
+    # python 3
+    basestring = str
+
+# a clock that doesn't jump when the system time is changed, where available
+monotonic = getattr(time, 'monotonic', time.time)
+
+# when glue started loading, and when each stage of starting up finished,
+# if they're being timed (see --timing)
+STARTED = monotonic()
+startup_timing = None
+
+
+def mark_startup(stage):
+    """
+    Records when a stage of starting up finished, if startup is being timed,
+    and writes them all to stderr once the first key has been injected.
+    """
+    if startup_timing is None or stage in startup_timing:
+        return
+    startup_timing[stage] = monotonic()
+    if stage == 'first key':
+        for when, name in sorted((when, name) for name, when in startup_timing.items()):
+            sys.stderr.write('{0:8.1f}ms {1}\r\n'.format((when - STARTED) * 1000, name))
 
 #   ALPHABET = [
 #       'alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf',
@@ -81,8 +119,28 @@ CODE_COMMANDS = {
     '\x1b[b': '<Down>',
     '\x1b[d': '<Left>',
     '\x1b[c': '<Right>',
+    # application cursor mode arrows and xterm F1-F4
+    '\x1boa': '<Up>',
+    '\x1bob': '<Down>',
+    '\x1bod': '<Left>',
+    '\x1boc': '<Right>',
+    '\x1bop': '<F1>',
+    '\x1boq': '<F2>',
+    '\x1bor': '<F3>',
+    '\x1bos': '<F4>',
+    # the escape key itself
+    '\x1b': '<Esc>',
 }
 
+# escape sequences xterm and putty send for keys without a command, so
+# that they are still recognised as a whole
+TERMINAL_SEQUENCES = [
+    '\x1b[1~', '\x1b[2~', '\x1b[3~', '\x1b[4~', '\x1b[5~', '\x1b[6~',
+    '\x1b[H', '\x1b[F', '\x1bOH', '\x1bOF',
+    # putty 'linux' function keys
+    '\x1b[[A', '\x1b[[B', '\x1b[[C', '\x1b[[D', '\x1b[[E',
+]
+
 
 def desktop_notification(message):
     pass
@@ -90,59 +148,611 @@ def desktop_notification(message):
     #os.system("echo 'message: blah' | zenity --notification --listen'")
 
 
-def input_word_generator():
+class LatencyTracer(object):
+    """
+    Histograms of how long each stage of turning input into keypresses takes,
+    counted in power of two microsecond buckets. Stages record themselves
+    when the module level `tracer` is set (see enable_tracing), and cost a
+    single test when it isn't:
+
+        read         tokenizing a chunk of input
+        word_timeout from the last input until a pending word is given up on
+        match        looking up a spoken command
+        parse        the current speech mode handling an input fragment
+        emit         injecting the keypresses for a keypress string
+        input_to_key from input arriving until keypresses for it are injected
+    """
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.histograms = {}
+        # when the most recent input was read
+        self.input_time = monotonic()
+
+    def record(self, stage, start):
+        """Records that stage took from start (a monotonic() time) until now."""
+        micros = int((monotonic() - start) * 1000000)
+        buckets = self.histograms.get(stage)
+        if buckets is None:
+            buckets = self.histograms[stage] = [0] * self.BUCKETS
+        buckets[min(micros.bit_length(), self.BUCKETS - 1)] += 1
+
+    @staticmethod
+    def _percentile(buckets, count, fraction):
+        # upper bound of the bucket the percentile falls in
+        seen = 0
+        for i, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= count * fraction:
+                return (1 << i) - 1
+        return None
+
+    def summaries(self):
+        """A dict for each stage with its counts and percentiles in microseconds."""
+        for stage in sorted(self.histograms):
+            buckets = self.histograms[stage]
+            count = sum(buckets)
+            yield {
+                'stage': stage,
+                'count': count,
+                'p50_us': self._percentile(buckets, count, 0.5),
+                'p99_us': self._percentile(buckets, count, 0.99),
+                'max_us': self._percentile(buckets, count, 1.0),
+                # bucket i counts latencies below 2**i microseconds
+                'buckets': buckets,
+            }
+
+    def dump(self, out):
+        """Writes the summaries to file object out as JSON lines."""
+        now = time.time()
+        for summary in self.summaries():
+            summary['time'] = now
+            out.write(json.dumps(summary) + '\n')
+        out.flush()
+
+
+# the LatencyTracer in use, if tracing is enabled
+tracer = None
+
+
+def enable_tracing(path):
+    """
+    Starts collecting stage latencies. They are appended to the file at path
+    (or stderr, for '-') as JSON lines on SIGUSR1 and when glue exits.
+    """
+    import atexit
+    import signal
+    global tracer
+    tracer = LatencyTracer()
+
+    # command lookups are timed here, so untraced lookups don't pay for it
+    find_command = Keypresser.find_command
+
+    def traced_find_command(self, *args):
+        start = monotonic()
+        try:
+            return find_command(self, *args)
+        finally:
+            tracer.record('match', start)
+    Keypresser.find_command = traced_find_command
+
+    def dump(*args):
+        if path == '-':
+            tracer.dump(sys.stderr)
+        else:
+            with open(path, 'a') as out:
+                tracer.dump(out)
+
+    signal.signal(signal.SIGUSR1, dump)
+    atexit.register(dump)
+
+
+DEBUG, INFO, WARNING, QUIET = 10, 20, 30, 100
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning'}
+
+
+class Log(object):
+    """
+    Levelled logging that never holds up typing. Messages below the level are
+    discarded before anything is formatted; the rest are queued, with their
+    unformatted arguments, for a background thread to format and write. If
+    the queue is full (say stdout is a stalled ssh session) messages are
+    dropped, and a count of them written once the writer catches up.
+    """
+
+    def __init__(self, stream=None, level=DEBUG, json_lines=False, max_queued=1000):
+        # None means whatever sys.stdout is when the message is written
+        self.stream = stream
+        self.level = level
+        self.json_lines = json_lines
+        self.dropped = 0
+        self._queue = queue.Queue(max_queued)
+        self._writer = None
+
+    def log(self, level, message, *args):
+        """Logs message.format(*args) at level."""
+        if level < self.level:
+            return
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait((time.time(), level, message, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, message, *args):
+        self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(INFO, message, *args)
+
+    def warning(self, message, *args):
+        self.log(WARNING, message, *args)
+
+    def _start_writer(self):
+        import atexit
+        self._writer = threading.Thread(target=self._write_messages)
+        self._writer.daemon = True
+        self._writer.start()
+        atexit.register(self.close)
+
+    def close(self, timeout=1.0):
+        """Waits (a while) for queued messages to be written."""
+        if self._writer is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+                self._writer.join(timeout)
+            except queue.Full:
+                pass
+            self._writer = None
+
+    def _format(self, created, level, message, args):
+        if self.json_lines:
+            return json.dumps({
+                'time': created,
+                'level': LEVEL_NAMES.get(level, level),
+                'message': message.format(*args),
+                'args': [a if isinstance(a, (basestring, int, float)) else repr(a)
+                         for a in args],
+            })
+        return message.format(*args)
+
+    def _write_messages(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            stream = self.stream or sys.stdout
+            try:
+                # the terminal is in cbreak mode, so lines need a \r
+                stream.write(self._format(*record) + '\r\n')
+                if self._queue.empty():
+                    # messages were dropped after those just written
+                    if self.dropped:
+                        dropped, self.dropped = self.dropped, 0
+                        stream.write(self._format(
+                            time.time(), WARNING, '{0} log messages dropped', (dropped,)) + '\r\n')
+                    stream.flush()
+            except Exception:
+                # logging must not take glue down
+                pass
+
+
+log = Log()
+
+
+# seconds dragon has between typing two characters of a word before we chop
+# it up! this is only the starting point; WordTimeout adapts it to how fast
+# dragon is actually typing, within the min and max bounds.
+WORD_TIMEOUT = 0.1
+WORD_TIMEOUT_MIN = 0.02
+WORD_TIMEOUT_MAX = 0.5
+
+# seconds dragon has to stop typing for before we take the utterance to have
+# ended. commands aren't matched across the end of an utterance, so this is
+# kept well clear of the gaps a stalled terminal or network can leave
+# mid-utterance, rather than adapting as the word timeout does
+UTTERANCE_TIMEOUT = WORD_TIMEOUT_MAX
+
+
+# seconds the rest of an escape sequence has to arrive before we decide the
+# escape key was pressed on its own
+ESCAPE_TIMEOUT = 0.02
+
+
+class EscapeDecoder(object):
+    """
+    Recognises terminal escape sequences using a prefix trie of the
+    sequences we know about, so a sequence is found in a single pass over
+    its characters whatever it ends in. Unknown CSI and SS3 sequences are
+    delimited by their standard grammar.
+    """
+
+    # marks a trie node at which a known sequence is complete
+    COMPLETE = ''
+
+    CSI_TAIL_RE = re.compile(r'[0-?]*[ -/]*[@-~]')
+    CSI_PARTIAL_RE = re.compile(r'[0-?]*[ -/]*\Z')
+
+    def __init__(self, sequences):
+        self.root = {}
+        for sequence in sequences:
+            assert sequence[0] == '\x1b'
+            node = self.root
+            for char in sequence[1:]:
+                node = node.setdefault(char, {})
+            node[self.COMPLETE] = True
+
+    def match(self, text, start):
+        """
+        Returns the end index of the escape sequence at text[start], or
+        None if text ends before the sequence does.
+        """
+        node = self.root
+        end = len(text)
+        i = start + 1
+        while i < end:
+            child = node.get(text[i])
+            if child is None:
+                if self.COMPLETE in node:
+                    return i
+                return self._match_unknown(text, start)
+            node = child
+            i += 1
+            if len(node) == 1 and self.COMPLETE in node:
+                return i
+        return None
+
+    def _match_unknown(self, text, start):
+        introducer = text[start+1]
+        if introducer == '[':
+            match = self.CSI_TAIL_RE.match(text, start + 2)
+            if match:
+                return match.end()
+            if self.CSI_PARTIAL_RE.match(text, start + 2):
+                return None
+        elif introducer == 'O':
+            if start + 2 < len(text):
+                return start + 3
+            return None
+        # not a sequence we understand. treat as the escape key alone
+        return start + 1
+
+
+ESCAPE_DECODER = EscapeDecoder(
+    # commands are matched lower-cased, the terminal sends upper case
+    [key.upper() for key in CODE_COMMANDS if key.startswith('\x1b')] +
+    TERMINAL_SEQUENCES
+)
+
+
+class WordTokenizer(object):
+    """
+    Splits raw terminal input into the fragments the speech modes parse:
+    words, runs of symbols, ' ', '\\n' and terminal escape sequences.
+
+    Input can arrive in chunks of any size. A word (or escape sequence)
+    still open at the end of a chunk is held back until the next feed(),
+    or until flush() is called because dragon has stopped typing.
+    """
+
+    TOKEN_RE = re.compile(
+        r"([\r\n])"               # newline
+        r"|( )"                    # space
+        # word. "-'" may be mixed in with letters without splitting the word
+        r"|([A-Za-z][A-Za-z\-']*)"
+        r"|([^A-Za-z \r\n\x1b]+)"   # run of symbols and digits
+    )
+
+    def __init__(self, escape_decoder=ESCAPE_DECODER):
+        self.escape_decoder = escape_decoder
+        self.pending = ''
+
+    def feed(self, data):
+        """Consume a chunk of input, returning the fragments it completes."""
+        text = self.pending + data
+        self.pending = ''
+        fragments = []
+        end = len(text)
+        pos = 0
+        while True:
+            escape = text.find('\x1b', pos)
+            stop = end if escape < 0 else escape
+            for match in self.TOKEN_RE.finditer(text, pos, stop):
+                group = match.lastindex
+                if group == 1:
+                    fragments.append('\n')
+                elif group == 2:
+                    fragments.append(' ')
+                elif match.end() == end:
+                    # may be continued by the next chunk
+                    self.pending = match.group()
+                else:
+                    fragments.append(match.group())
+            if escape < 0:
+                break
+
+            sequence_end = self.escape_decoder.match(text, escape)
+            if sequence_end is None:
+                # rest of the sequence is still on its way
+                self.pending = text[escape:]
+                break
+            fragments.append(text[escape:sequence_end])
+            pos = sequence_end
+        return fragments
+
+    def pending_escape(self):
+        """True if the pending input is an incomplete escape sequence."""
+        return self.pending[:1] == '\x1b'
+
+    def flush(self):
+        """Give up waiting for the rest of the pending word."""
+        fragments = [self.pending] if self.pending else []
+        self.pending = ''
+        return fragments
+
+
+class WordTimeout(object):
+    """
+    Learns how long to wait for the next character of a word from the gaps
+    observed between characters dragon types into a word, in the way TCP
+    estimates its retransmit timeout: a smoothed mean of the gaps plus four
+    times their smoothed deviation. The result, kept between the minimum and
+    maximum, is in `current`.
+    """
+
+    # weights given to each new gap in the mean and deviation
+    MEAN_GAIN = 1.0 / 8
+    DEVIATION_GAIN = 1.0 / 4
+
+    def __init__(self, minimum=WORD_TIMEOUT_MIN, maximum=WORD_TIMEOUT_MAX, initial=WORD_TIMEOUT):
+        assert minimum <= maximum
+        self.minimum = minimum
+        self.maximum = maximum
+        self.mean_gap = None
+        self.gap_deviation = None
+        self.current = min(max(initial, minimum), maximum)
+
+    def observe(self, gap):
+        """Record the gap in seconds between two characters of a word."""
+        if gap > self.maximum:
+            # a pause longer than we would ever wait says nothing about
+            # typing speed
+            return
+        if self.mean_gap is None:
+            self.mean_gap = gap
+            self.gap_deviation = gap / 2
+        else:
+            self.gap_deviation += self.DEVIATION_GAIN * (abs(gap - self.mean_gap) - self.gap_deviation)
+            self.mean_gap += self.MEAN_GAIN * (gap - self.mean_gap)
+        # allow at least twice the usual gap, for when dragon types so evenly
+        # that the deviation is near zero
+        timeout = max(self.mean_gap + 4 * self.gap_deviation, 2 * self.mean_gap)
+        self.current = min(max(timeout, self.minimum), self.maximum)
+
+
+class FragmentReader(object):
+    """
+    Turns dragon's typing, as it is read, into the fragments the speech
+    modes parse, using the time between reads to tell where words and
+    utterances end. It does no I/O itself: the caller waits up to timeout()
+    seconds for input, then passes what it read to feed(), or calls
+    timed_out() if nothing came. Both return the fragments to parse, an
+    empty fragment ending each utterance.
+    """
+
+    def __init__(self, word_timeout=None, utterance_timeout=UTTERANCE_TIMEOUT):
+        if word_timeout is None:
+            word_timeout = WordTimeout()
+        self.word_timeout = word_timeout
+        self.utterance_timeout = utterance_timeout
+        self.tokenizer = WordTokenizer()
+        # when to stop waiting for the rest of a word, or the utterance
+        self.deadline = None
+        # time of the last read, and whether it left a word unfinished
+        self.last_input = None
+        self.mid_word = False
+
+    def timeout(self):
+        """Seconds to wait for input, or None to wait until some comes."""
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - monotonic())
+
+    def feed(self, data):
+        """Takes a chunk of input, returning the fragments it completes."""
+        now = monotonic()
+        if tracer is not None:
+            tracer.input_time = now
+        if self.mid_word and data[0] not in ' \r\n\x1b':
+            # more of the word we were waiting on (even if we gave up on it)
+            self.word_timeout.observe(now - self.last_input)
+        self.last_input = now
+
+        tokenizer = self.tokenizer
+        fragments = tokenizer.feed(data)
+        self.mid_word = bool(tokenizer.pending) and not tokenizer.pending_escape()
+        if self.mid_word:
+            self.deadline = now + self.word_timeout.current
+        elif tokenizer.pending:
+            # escape sequences are written in one go. don't wait long
+            self.deadline = now + ESCAPE_TIMEOUT
+        else:
+            self.deadline = now + self.utterance_timeout
+        if tracer is not None:
+            tracer.record('read', now)
+        return fragments
+
+    def timed_out(self):
+        """Returns the fragments ended by timeout() passing without input."""
+        if not self.tokenizer.pending:
+            # dragon has stopped typing: the end of the utterance
+            self.deadline = None
+            return ['']
+        if tracer is not None:
+            tracer.record('word_timeout', self.last_input)
+        self.deadline = self.last_input + self.utterance_timeout
+        return self.tokenizer.flush()
+
+    def end(self):
+        """Returns the fragments left at the end of input."""
+        fragments = self.tokenizer.flush()
+        if self.deadline is not None:
+            fragments.append('')
+            self.deadline = None
+        return fragments
+
+
+def input_word_generator(fd=None, word_timeout=None):
     import tty
-    import time
-    import fcntl
-    import os
-    tty.setcbreak(sys.stdin)
-    # make stdin a non-blocking file
-    fd = sys.stdin.fileno()
-    fl = fcntl.fcntl(fd, fcntl.F_GETFL)
-    fcntl.fcntl(fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
-
-    # seconds dragon has to complete typing a word before we chop it up!
-    WORD_TIMEOUT = 0.1
-
-    # characters that may be mixed in with [A-Za-z] letters without splitting the word
-    NON_SPLITTERS = "-'"
-
-    word = ''
-    word_timeout = 0
+    import select
+
+    if fd is None:
+        fd = sys.stdin.fileno()
+    if os.isatty(fd):
+        tty.setcbreak(fd)
+
+    reader = FragmentReader(word_timeout)
     while True:
+        # block until input arrives, or until the pending word or the
+        # utterance is due
+        readable, _, _ = select.select([fd], [], [], reader.timeout())
+        if not readable:
+            fragments = reader.timed_out()
+        else:
+            # take everything dragon has typed so far in one go
+            data = os.read(fd, 4096)
+            if not data:
+                # end of input
+                for fragment in reader.end():
+                    yield fragment
+                return
+            if not isinstance(data, str):
+                # python 3. latin-1 maps bytes 1:1 to characters, as python 2 does
+                data = data.decode('latin-1')
+            fragments = reader.feed(data)
+        for fragment in fragments:
+            yield fragment
+
+
+def read_ahead(fragments, max_queued=256):
+    """
+    Iterates over fragments, which are read by a background thread so input
+    keeps being read while glue is busy. At most max_queued fragments are
+    read ahead before the thread waits.
+    """
+    fragment_queue = queue.Queue(max_queued)
+    end = object()
+
+    def read():
         try:
-            char = sys.stdin.read(1)
-
-            if word == '':
-                word_timeout = time.time() + WORD_TIMEOUT
-
-            if char == '\x1b':
-                # terminal escape code for special keys. read to terminating ~
-                word += char
-                # XXX note will timeout and be emitted for sequences not ending ~,
-                # but should recognise them more sanely...
-                while word[-1] != '~':
-                    word += sys.stdin.read(1)
-                yield(word)
-                word = ''
-            elif char == '\r' or char == '\n':
-                yield(word)
-                yield('\n')
-                word = ''
-            elif char == ' ':
-                yield(word)
-                yield(' ')
-                word = ''
-            elif len(word)>0 and char not in NON_SPLITTERS and char.isalpha() != word[0].isalpha():
-                yield(word)
-                word = char
-            else:
-                word += char
-        except IOError:
-            if time.time() > word_timeout and word != '':
-                yield word
-                word = ''
-            time.sleep(0.1)
+            for fragment in fragments:
+                fragment_queue.put((fragment, None))
+        except Exception:
+            fragment_queue.put((end, sys.exc_info()[1]))
+        else:
+            fragment_queue.put((end, None))
+
+    reader = threading.Thread(target=read)
+    reader.daemon = True
+    reader.start()
+    while True:
+        fragment, error = fragment_queue.get()
+        if fragment is end:
+            if error is not None:
+                raise error
+            return
+        yield fragment
+
+
+class KeyInjector(object):
+    """
+    Injects keypress plans (lists of parse_keypresses() events) for a
+    Keypresser from a background thread, in the order they were queued.
+    Whatever is queued when the thread gets to it goes out in a single
+    keyboard batch. At most max_queued plans wait before queueing more blocks.
+    """
+
+    def __init__(self, keypresser, max_queued=256):
+        self.keypresser = keypresser
+        self.error = None
+        self._queue = queue.Queue(max_queued)
+        self._thread = threading.Thread(target=self._inject)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, plan):
+        """Queues a plan to be injected."""
+        self._raise_error()
+        self._queue.put(plan)
+
+    def close(self):
+        """Waits for everything queued to be injected, and stops the thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        # pass on a failure injecting keys to the thread feeding us
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _inject(self):
+        keypresser = self.keypresser
+        closed = False
+        while not closed:
+            pending = [self._queue.get()]
+            # and whatever else was queued while the last batch went out
+            try:
+                while True:
+                    pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if pending[-1] is None:
+                closed = True
+                pending.pop()
+            if tracer is not None:
+                start = monotonic()
+            try:
+                with keypresser.keyboard().batch():
+                    for plan in pending:
+                        for events in plan:
+                            keypresser.emit_key_events(events)
+                if startup_timing is not None:
+                    mark_startup('first key')
+            except Exception:
+                self.error = sys.exc_info()[1]
+            if tracer is not None:
+                tracer.record('emit', start)
+                tracer.record('input_to_key', tracer.input_time)
+
+
+class CommandTrie(object):
+    """
+    A command table (like CODE_EXPANSIONS) compiled for matching by
+    Keypresser.find_command. root maps the first spoken word of a command
+    to a node; each node is an (action, children) pair, where the action is
+    a keypress string, a callable or None, and children maps the next
+    spoken word to a node, or is None.
+    """
+
+    def __init__(self, table):
+        self.root = self._compile(table)
+
+    @classmethod
+    def _compile(cls, table):
+        # a '' entry in a nested table is the action for the words so far,
+        # as in {'delete': {'': delete_word, 'two': delete_two_words}}
+        children = {}
+        for word, entry in table.items():
+            if isinstance(entry, dict):
+                entry = dict(entry)
+                children[word] = (entry.pop('', None), cls._compile(entry))
+            elif word:
+                children[word] = (entry, None)
+        return children
 
 
 class SpeechMode(object):
@@ -165,9 +775,13 @@ class ModeDictation(SpeechMode):
         if word == ' ' and self.just_switched_to_dictation:
             # eat the first space after switching to this mode,
             # since it is spurious
+            word = self.keypresser.next_input_fragment()
+            if not word:
+                # the utterance ended. try again with the next one
+                self.keypresser.push_back_fragment(word)
+                return
             self.just_switched_to_dictation = False
 
-            word = self.keypresser.next_input_fragment()
             # capitalize first word (since in this case Dragon won't do it for us)
             word = word[0].upper() + word[1:]
 
@@ -229,6 +843,192 @@ class CapitalEntryMode(EntryMode):
             return word
 
 
+class TargetProfile(object):
+    """
+    What the application being typed into can do to delete text. This
+    generic profile only relies on backspace.
+    """
+    # the keypresses deleting a word back from the cursor, if any
+    kill_word = None
+    # words shorter than this are cheaper to backspace over
+    min_kill_length = 3
+
+    def word_length(self, typed):
+        """
+        Returns how much of the end of typed kill_word would delete, or
+        None if that depends on text from before typed.
+        """
+        return None
+
+    def delete_keys(self, typed, length):
+        """
+        Returns the keypresses deleting the last length characters typed.
+        typed is the text glue knows is before the cursor (Keypresser.typed).
+        """
+        keys = ''
+        while length > 0:
+            word_length = self.word_length(typed)
+            if word_length is None or word_length > length:
+                break
+            if word_length < self.min_kill_length:
+                keys += '<BS>' * word_length
+            else:
+                keys += self.kill_word
+            typed = typed[:-word_length]
+            length -= word_length
+        return keys + '<BS>' * length
+
+
+class ReadlineProfile(TargetProfile):
+    """Shells and the like: ^W deletes back to whitespace (unix-word-rubout)."""
+    kill_word = '<C-w>'
+
+    def word_length(self, typed):
+        start = len(typed.rstrip())
+        while start > 0 and not typed[start - 1].isspace():
+            start -= 1
+        if start == 0:
+            # the word might carry on before what we know of
+            return None
+        return len(typed) - start
+
+
+class VimInsertProfile(TargetProfile):
+    """
+    Vim's insert mode: ^W deletes back over whitespace then either a run of
+    keyword characters or a run of other non-blank characters. Assumes
+    'backspace' includes start, as in defaults.vim, so ^W can delete text
+    from before the insert started.
+    """
+    kill_word = '<C-w>'
+
+    @staticmethod
+    def _is_keyword(char):
+        return char.isalnum() or char == '_'
+
+    def word_length(self, typed):
+        end = len(typed.rstrip())
+        if end == 0:
+            return None
+        keyword = self._is_keyword(typed[end - 1])
+        start = end
+        while start > 0 and not typed[start - 1].isspace() and self._is_keyword(typed[start - 1]) == keyword:
+            start -= 1
+        if start == 0:
+            return None
+        return len(typed) - start
+
+
+TARGET_PROFILES = {
+    'generic': TargetProfile(),
+    'readline': ReadlineProfile(),
+    'vim-insert': VimInsertProfile(),
+}
+
+
+# an edit ModeCode has made, as EditLog.peek() returns it. before and after
+# are (identifier length, entry mode number) pairs
+Edit = collections.namedtuple('Edit', 'keys length reversible before after utterance')
+
+
+class EditLog(object):
+    """
+    The last capacity edits (the keys typed for a spoken word) ModeCode has
+    made, for undoing and redoing, in fixed size arrays used as a ring
+    buffer. For each it keeps the keypress strings sent (a tuple, as run
+    together they could spell out another key name like '<BS>'), how many
+    characters they typed, whether backspacing over those undoes them, the
+    identifier state before and after, and the Keypresser.utterance it was
+    spoken in. Undone edits can be redone until another edit is pushed.
+    """
+
+    def __init__(self, capacity=30):
+        assert capacity >= 1
+        self.capacity = capacity
+        self.keys = [None] * capacity
+        self.lengths = array('H', [0]) * capacity
+        self.reversible = array('B', [0]) * capacity
+        self.positions_before = array('H', [0]) * capacity
+        self.modes_before = array('B', [0]) * capacity
+        self.positions_after = array('H', [0]) * capacity
+        self.modes_after = array('B', [0]) * capacity
+        self.utterances = array('L', [0]) * capacity
+        # index after the newest edit, how many edits there are to undo,
+        # and how many edits each undo still to be redone took
+        self._top = 0
+        self._undoable = 0
+        self._redo_counts = []
+
+    def __len__(self):
+        return self._undoable
+
+    def __repr__(self):
+        return 'EditLog({0!r})'.format([self.keys[i % self.capacity]
+            for i in range(self._top - self._undoable, self._top)])
+
+    def push(self, keys, length, reversible, before, after, utterance):
+        i = self._top % self.capacity
+        self.keys[i] = keys
+        self.lengths[i] = min(length, 0xffff)
+        self.reversible[i] = reversible
+        self.positions_before[i] = min(before[0], 0xffff)
+        self.modes_before[i] = before[1]
+        self.positions_after[i] = min(after[0], 0xffff)
+        self.modes_after[i] = after[1]
+        self.utterances[i] = utterance
+        self._top += 1
+        self._undoable = min(self._undoable + 1, self.capacity)
+        del self._redo_counts[:]
+
+    def clear(self):
+        """Forgets every edit, for when what they typed can't be undone by them."""
+        self._undoable = 0
+        del self._redo_counts[:]
+
+    def peek(self, n=0):
+        """The nth newest edit that can be undone, as an Edit, or None."""
+        if n >= self._undoable:
+            return None
+        i = (self._top - 1 - n) % self.capacity
+        return Edit(self.keys[i], self.lengths[i], bool(self.reversible[i]),
+                    (self.positions_before[i], self.modes_before[i]),
+                    (self.positions_after[i], self.modes_after[i]),
+                    self.utterances[i])
+
+    def undo(self, count):
+        """
+        Takes up to count of the newest edits off the log, stopping at one
+        that can't be reversed, and returns them newest first.
+        """
+        edits = []
+        while len(edits) < count:
+            edit = self.peek()
+            if edit is None or not edit.reversible:
+                break
+            edits.append(edit)
+            self._top -= 1
+            self._undoable -= 1
+        if edits:
+            self._redo_counts.append(len(edits))
+        return edits
+
+    def redo(self):
+        """Puts back the edits the last undo() took, and returns them oldest first."""
+        if not self._redo_counts:
+            return []
+        count = self._redo_counts.pop()
+        self._top += count
+        self._undoable += count
+        return [self.peek(n) for n in reversed(range(count))]
+
+
+# spoken numbers, for commands like 'delete three'
+NUMBER_WORDS = {
+    'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+}
+
+
 class ModeCode(SpeechMode):
 
     ENTRY_MODES = {
@@ -245,16 +1045,21 @@ class ModeCode(SpeechMode):
         'constant': EntryMode('_', 'upper', False, False, ('<Esc>', '\n'), False, True),
         'dictate': EntryMode(None, None, True, False, ('<Esc>', '\n'), False, False)
     }
+    # entry modes by number, as the undo history records them
+    ENTRY_MODE_NAMES = sorted(ENTRY_MODES)
+    ENTRY_MODE_NUMBERS = dict(zip(map(ENTRY_MODES.get, ENTRY_MODE_NAMES), range(len(ENTRY_MODE_NAMES))))
 
-    def __init__(self, keypresser):
+    def __init__(self, keypresser, undo_capacity=30):
         self.keypresser = keypresser
         self.key_mods = set([])
         # don't interpret next word as a command or expansion
         self.escape_next_word = False
         self.current_identifier_length = 0
-        # just a stack of integer length of previously entered words
-        self.undo_stack = []
+        # edits made, and the keys typed so far for the word being parsed
+        self.edits = EditLog(undo_capacity)
+        self._emitted = None
         self.entry_mode = ModeCode.ENTRY_MODES['spell']
+        self.commands = self._compile_commands()
 
     def switch_to(self):
         super(ModeCode, self).__init__()
@@ -269,26 +1074,29 @@ class ModeCode(SpeechMode):
     def set_escape_next_word(self):
         self.escape_next_word = True
 
-    def emit_keypresses(self, keys, add_to_undo_stack=True):
+    def _emit(self, keys):
+        # types keys for the word being parsed
+        self.keypresser.emit_keypresses(keys)
+        if self._emitted is not None:
+            self._emitted.append(keys)
+
+    def emit_keypresses(self, keys):
         if 'shift' in self.key_mods:
             i = 0
-            for i in xrange(0, len(keys)):
+            for i in range(0, len(keys)):
                 if keys[i].isalpha():
                     break
             if i < len(keys):
                 keys = keys[0:i] + keys[i].upper() + keys[i+1:]
         if 'control' in self.key_mods:
-            self.keypresser.emit_keypresses('<C-{0}>'.format(keys[0].lower()))
+            self._emit('<C-{0}>'.format(keys[0].lower()))
             keys = keys[1:]
-            add_to_undo_stack = False
         if 'alternate' in self.key_mods:
-            self.keypresser.emit_keypresses('<A-{0}>'.format(keys[0].lower()))
+            self._emit('<A-{0}>'.format(keys[0].lower()))
             keys = keys[1:]
-            add_to_undo_stack = False
         if 'win' in self.key_mods:
-            self.keypresser.emit_keypresses('<Mod4-{0}>'.format(keys[0].lower()))
+            self._emit('<Mod4-{0}>'.format(keys[0].lower()))
             keys = keys[1:]
-            add_to_undo_stack = False
 
         if keys != ' ':
             # wipe modifiers on all keys but space
@@ -296,25 +1104,65 @@ class ModeCode(SpeechMode):
             self.key_mods = set([])
 
         if len(keys) > 0:
-            self.keypresser.emit_keypresses(keys)
-            if add_to_undo_stack:
-                self.undo_stack.append(len(keys))
-                # maximum undo stack length
-                self.undo_stack = self.undo_stack[-30:]
-
-    def handle_as_expansion(self, word):
-        return self.keypresser.match_command(
-            word,
-            CODE_EXPANSIONS,
-            strip_spaces_from_keypresses=self.entry_mode == ModeCode.ENTRY_MODES['squeeze']
-        )
-
-    def handle_as_command(self, word):
-        return self.keypresser.match_command(
-            word,
-            CODE_COMMANDS,
-            strip_spaces_from_keypresses=self.entry_mode == ModeCode.ENTRY_MODES['squeeze']
-        )
+            self._emit(keys)
+
+    # kinds of entry in the command table
+    ACTION = 0      # a language command, calling a method of ours
+    COMMAND = 1     # CODE_COMMANDS keypresses. ends identifier entry
+    EXPANSION = 2   # CODE_EXPANSIONS keypresses. splits the identifier
+
+    def _compile_commands(self):
+        """
+        Builds the table of everything a spoken word can be matched
+        against, as (kind, action) entries, once for this instance.
+        """
+        def tag(kind, table):
+            tagged = {}
+            for word, entry in table.items():
+                if isinstance(entry, dict):
+                    tagged[word] = tag(kind, entry)
+                else:
+                    tagged[word] = (kind, entry)
+            return tagged
+
+        delete = {'': self.delete_last_word}
+        for word, count in NUMBER_WORDS.items():
+            delete[word] = delete[str(count)] = functools.partial(self.delete_last_words, count)
+        actions = {
+            # end identifier entry and return to single keypress mode
+            'delete': delete,
+            'redo': self.redo_last_word,
+            'undo': {
+                'utterance': self.undo_utterance,
+            },
+            'junk': self.delete_current_identifier,
+            'literal': self.set_escape_next_word,
+            'big': functools.partial(self.set_key_mod, 'shift'),
+            'alternate': functools.partial(self.set_key_mod, 'alternate'),
+            'control': functools.partial(self.set_key_mod, 'control'),
+            'windows': {
+                'key': functools.partial(self.set_key_mod, 'win'),
+            }
+        }
+        for entry_mode in ModeCode.ENTRY_MODES:
+            actions[entry_mode] = functools.partial(self.set_entry_mode, entry_mode)
+
+        table = tag(ModeCode.EXPANSION, CODE_EXPANSIONS)
+        for kind, entries in ((ModeCode.COMMAND, CODE_COMMANDS), (ModeCode.ACTION, actions)):
+            tagged = tag(kind, entries)
+            assert not set(tagged) & set(table), 'command words must be unique'
+            table.update(tagged)
+        return CommandTrie(table)
+
+    def _command_allowed(self, command):
+        # expansions split operators, which only makes sense where we are
+        # inserting the spaces, not dragon
+        return command[0] != ModeCode.EXPANSION or self.entry_mode.suppress_dragon_spaces is True
+
+    def emit_command_keypresses(self, keys):
+        if self.entry_mode == ModeCode.ENTRY_MODES['squeeze']:
+            keys = keys.strip()
+        self._emit(keys)
 
     def set_entry_mode(self, type):
         self.current_identifier_length = 0
@@ -324,56 +1172,128 @@ class ModeCode(SpeechMode):
         """and previous operator and start new operator of same type"""
         self.current_identifier_length = 0
 
+    def delete_keys(self, length):
+        """The cheapest keypresses the target has for deleting length characters."""
+        return self.keypresser.target.delete_keys(self.keypresser.typed, length)
+
+    def _state(self):
+        return self.current_identifier_length, ModeCode.ENTRY_MODE_NUMBERS[self.entry_mode]
+
+    def _restore_state(self, state):
+        self.current_identifier_length, mode = state
+        self.entry_mode = ModeCode.ENTRY_MODES[ModeCode.ENTRY_MODE_NAMES[mode]]
+
+    def _log_edit(self, keys, before):
+        # keys is a tuple of keypress strings. an edit can be backspaced over
+        # if it only typed characters
+        length = 0
+        reversible = True
+        for keypresses in keys:
+            for key, modifier, count in parse_keypresses(keypresses):
+                if modifier is None and len(key) == 1:
+                    length += count
+                else:
+                    reversible = False
+        self.edits.push(keys, length, reversible, before, self._state(), self.keypresser.utterance)
+
+    def undo_edits(self, count):
+        """
+        Deletes what the newest count edits typed, as far back as the first
+        that can't be undone, and goes back to the identifier state before them.
+        """
+        edits = self.edits.undo(count)
+        # the log is formatted later, on the writer thread: snapshot it now
+        log.debug('undo {0!r}, leaving {1}', [edit.keys for edit in edits], repr(self.edits))
+        if edits:
+            self.key_mods = set([])
+            self.keypresser.emit_keypresses(self.delete_keys(sum(edit.length for edit in edits)))
+            self._restore_state(edits[-1].before)
+
     def delete_last_word(self):
-        print (self.undo_stack)
-        if len(self.undo_stack) > 0:
-            length = self.undo_stack.pop()
-            self.current_identifier_length -= length
-            if self.current_identifier_length == 0:
-                # if we deleted our way all the way to the start, remember we're starting an identifier
-                self.split_identifier()
-            self.emit_keypresses('<BS>' * length, add_to_undo_stack=False)
+        self.undo_edits(1)
+
+    def delete_last_words(self, count):
+        self.undo_edits(count)
+
+    def undo_utterance(self):
+        """Undoes the edits made for the last utterance with any."""
+        newest = self.edits.peek()
+        if newest is not None:
+            count = 1
+            while True:
+                edit = self.edits.peek(count)
+                if edit is None or edit.utterance != newest.utterance:
+                    break
+                count += 1
+            self.undo_edits(count)
+
+    def redo_last_word(self):
+        """Types what the last undo deleted again, back in the identifier state after it."""
+        edits = self.edits.redo()
+        log.debug('redo {0!r}', [edit.keys for edit in edits])
+        if edits:
+            for edit in edits:
+                for keypresses in edit.keys:
+                    self.keypresser.emit_keypresses(keypresses)
+            self._restore_state(edits[-1].after)
 
     def delete_current_identifier(self):
         if self.current_identifier_length > 0:
-            self.emit_keypresses('<BS>' * self.current_identifier_length, add_to_undo_stack=False)
+            # undo the edits typing the identifier, if that's what they add up to
+            count = length = 0
+            edit = self.edits.peek()
+            while edit is not None and edit.reversible and length < self.current_identifier_length:
+                length += edit.length
+                count += 1
+                if edit.before[0] == 0:
+                    break
+                edit = self.edits.peek(count)
+            if length == self.current_identifier_length:
+                self.undo_edits(count)
+            else:
+                self.keypresser.emit_keypresses(self.delete_keys(self.current_identifier_length))
+                # the log doesn't add up to the identifier, so undoing its
+                # edits now would delete the wrong text
+                self.edits.clear()
             self.split_identifier()
-            
+
     def parse(self, word):
         if len(word) == 0:
             return
+        # log what typing the word did, as one edit
+        before = self._state()
+        self._emitted = []
+        try:
+            self._parse(word)
+        finally:
+            emitted, self._emitted = self._emitted, None
+        if emitted:
+            self._log_edit(tuple(emitted), before)
 
-        if word != ' ': print ("SAID '{0}'".format(word), end="\r\n")
-
-        # special command to change code language or enter variable names
-        if not self.escape_next_word and self.keypresser.match_command(
-            word.lower(), {
-                # end identifier entry and return to single keypress mode
-                'delete': self.delete_last_word,
-                'junk': self.delete_current_identifier,
-                'literal': self.set_escape_next_word,
-                'spell': functools.partial(self.set_entry_mode, 'spell'),
-                'capital': functools.partial(self.set_entry_mode, 'capital'),
-                'camel': functools.partial(self.set_entry_mode, 'camel'),
-                'line': functools.partial(self.set_entry_mode, 'line'),
-                'strike': functools.partial(self.set_entry_mode, 'strike'),
-                'spacey': functools.partial(self.set_entry_mode, 'spacey'),
-                'squeeze': functools.partial(self.set_entry_mode, 'squeeze'),
-                'sequel': functools.partial(self.set_entry_mode, 'sequel'),
-                'keyword': functools.partial(self.set_entry_mode, 'keyword'),
-                'single': functools.partial(self.set_entry_mode, 'single'),
-                'constant': functools.partial(self.set_entry_mode, 'constant'),
-                'dictate': functools.partial(self.set_entry_mode, 'dictate'),
-                'big': functools.partial(self.set_key_mod, 'shift'),
-                'alternate': functools.partial(self.set_key_mod, 'alternate'),
-                'control': functools.partial(self.set_key_mod, 'control'),
-                'windows': {
-                    'key': functools.partial(self.set_key_mod, 'win'),
-                }
-            }
-        ):
-            # matched language command. done
-            print ("Command "+word.lower(), end="\r\n")
+    def _parse(self, word):
+        if len(word) == 0:
+            return
+
+        if word != ' ': log.debug("SAID '{0}'", word)
+
+        # commands, expansions and the language commands that change code
+        # language or enter variable names, in a single lookup
+        command = None
+        if not self.escape_next_word:
+            command = self.keypresser.find_command(word.lower(), self.commands, self._command_allowed)
+
+        if command is not None:
+            kind, action = command
+            if kind == ModeCode.ACTION:
+                # matched language command. done
+                log.info("Command {0}", word.lower())
+                action()
+            elif kind == ModeCode.COMMAND:
+                self.emit_command_keypresses(action)
+                self.set_entry_mode('spell')
+            else:
+                self.emit_command_keypresses(action)
+                self.split_identifier()
             return
 
         if word == ' ':
@@ -383,17 +1303,7 @@ class ModeCode(SpeechMode):
 
             return
 
-        if not self.escape_next_word and self.handle_as_command(word.lower()):
-            self.set_entry_mode('spell')
-            return
-
-        elif self.entry_mode.suppress_dragon_spaces is True and \
-                not self.escape_next_word and \
-                self.handle_as_expansion(word.lower()):
-            self.split_identifier()
-            return
-
-        elif word[0].isalpha():
+        if word[0].isalpha():
             word = self.entry_mode.transform_word(word, self)
 
             self.current_identifier_length += len(word)
@@ -407,95 +1317,291 @@ class ModeCode(SpeechMode):
                 # split the identifier on other symbol entry
                 self.split_identifier()
             self.emit_keypresses(word[0])
-            self.parse(word[1:])
+            self._parse(word[1:])
 
         # clear escaping flag since 'next word' has happened
         self.escape_next_word = False
 
 
+# <Name> keys usable in keypress strings, and the PyKeyboard attribute for each.
+# <F1> to <F35> are also understood
+SPECIAL_KEYS = {
+    'Esc': 'escape_key',
+    'Return': 'return_key',
+    'BS': 'backspace_key',
+    'Tab': 'tab_key',
+    'Up': 'up_key',
+    'Down': 'down_key',
+    'Left': 'left_key',
+    'Right': 'right_key',
+}
+
+# <Mod-x> modifiers usable in keypress strings
+MODIFIER_KEYS = {
+    'C': 'control_key',
+    'A': 'alt_key',
+    'Mod4': 'super_l_key',
+}
+
+KEYPRESS_RE = re.compile(
+    r'<({0}|F\d+)>|<({1})-(\w)>|(.)'.format(
+        '|'.join(SPECIAL_KEYS), '|'.join(MODIFIER_KEYS)),
+    re.DOTALL
+)
+
+# keypress strings already parsed by parse_keypresses
+_parsed_keypresses = {}
+
+# keyboards to inject keypresses with: the module and class of each, imported
+# when the keyboard is set up. system is the platform's PyKeyboard (the X
+# display), and null types nothing, to run glue without a display
+KEYBOARD_BACKENDS = {
+    'system': ('pykeyboard', 'PyKeyboard'),
+    'null': ('pykeyboard.recording', 'NullKeyboard'),
+}
+
+
+def parse_keypresses(keypresses):
+    """
+    Turns a keypress string like 'x = <Esc>' or '<C-w>' into a tuple of
+    (key, modifier, count) events in a single pass. key is either a character
+    to type or the name of a special key ('Esc', 'F5'...), modifier is None
+    or the name of a modifier ('C', 'A', 'Mod4'), and count how many times
+    in a row the key is pressed, so runs like '<BS><BS><BS>' are a single
+    event. Results are cached, since the same strings come up again and again.
+    """
+    events = _parsed_keypresses.get(keypresses)
+    if events is None:
+        events = []
+        last = None
+        for special, modifier, modified, char in KEYPRESS_RE.findall(keypresses):
+            if special:
+                key = (special, None)
+            elif modifier:
+                key = (modified, modifier)
+            else:
+                key = (char, None)
+            if key == last:
+                events[-1] = key + (events[-1][2] + 1,)
+            else:
+                events.append(key + (1,))
+                last = key
+        events = tuple(events)
+        if len(_parsed_keypresses) > 1000:
+            # unbounded variety, like runs of <BS> of every length. start over
+            _parsed_keypresses.clear()
+        _parsed_keypresses[keypresses] = events
+    return events
+
+
 class Keypresser(object):
-    def __init__(self):
-        self.kb = pykeyboard.PyKeyboard()
+    # how much of the text typed to keep track of
+    TYPED_LENGTH = 256
+
+    def __init__(self, kb=None, fragments=None, pipeline=False, target='generic', undo_capacity=30,
+                 backend='system'):
+        # kb is the keyboard to inject keypresses with, and fragments an
+        # iterable of input fragments. by default, the KEYBOARD_BACKENDS
+        # entry named by backend and words read from the terminal. with
+        # pipeline, input is read and keys injected on their own threads.
+        # target names the TARGET_PROFILES entry for the application being
+        # typed into, and undo_capacity is how many words can be deleted
+        self.kb = None
+        if kb is None:
+            # importing pykeyboard and connecting to X takes a while. do it
+            # while the first words are read, and wait for it when there are
+            # keys to type
+            self._keyboard_error = None
+            self._keyboard_loader = threading.Thread(target=self._load_keyboard,
+                                                     args=KEYBOARD_BACKENDS[backend])
+            self._keyboard_loader.daemon = True
+            self._keyboard_loader.start()
+        else:
+            self._use_keyboard(kb)
         self.commands_enabled = True
-        self.mode_code = ModeCode(self)
+        self.target = TARGET_PROFILES[target]
+        # the end of the text typed since glue last lost track of the cursor
+        # (by sending a key other than characters and backspace)
+        self.typed = ''
+        self.mode_code = ModeCode(self, undo_capacity)
         self.mode_dictation = ModeDictation(self)
         self.current_mode = self.mode_code
         self.current_mode.switch_to()
-        self._words_in = input_word_generator()
-        # words that might have been pushed back by a parser
-        self._words_queued = []
+        # how long the reader waits for the rest of a word. exposed for monitoring
+        self.word_timeout = WordTimeout()
+        if fragments is None:
+            fragments = input_word_generator(word_timeout=self.word_timeout)
+        self.injector = None
+        if pipeline:
+            fragments = read_ahead(fragments)
+            self.injector = KeyInjector(self)
+        self._words_in = iter(fragments)
+        # words read ahead by command matching, or pushed back by a parser
+        self._words_queued = collections.deque()
+        # parse_keypresses() events for the current utterance, not yet injected
+        self._plan = []
+        # counts the utterances read, for the edit log
+        self.utterance = 0
+
+    def _use_keyboard(self, kb):
+        # keyboard keys for the key names of parse_keypresses() events
+        special_keys = dict((name, getattr(kb, attr)) for name, attr in SPECIAL_KEYS.items())
+        for i in range(1, len(kb.function_keys)):
+            special_keys['F{0}'.format(i)] = kb.function_keys[i]
+        self.special_keys = special_keys
+        self.modifier_keys = dict((name, getattr(kb, attr)) for name, attr in MODIFIER_KEYS.items())
+        # last, as it says the keyboard is ready
+        self.kb = kb
+
+    def _load_keyboard(self, module, name):
+        try:
+            keyboard_class = getattr(importlib.import_module(module), name)
+            mark_startup('keyboard imported')
+            self._use_keyboard(keyboard_class())
+            mark_startup('keyboard ready')
+        except Exception:
+            self._keyboard_error = sys.exc_info()[1]
+
+    def keyboard(self):
+        """Returns the PyKeyboard, waiting for it to be set up if need be."""
+        if self.kb is None:
+            self._keyboard_loader.join()
+            if self._keyboard_error is not None:
+                raise self._keyboard_error
+        return self.kb
 
     def next_input_fragment(self):
         if len(self._words_queued):
-            word = self._words_queued.pop()
+            word = self._words_queued.popleft()
         else:
-            word = self._words_in.next()
+            word = next(self._words_in)
         #print('raw: \'{0}\''.format(repr(word)))
         return word
 
     def push_back_fragment(self, frag):
-        self._words_queued.append(frag)
+        self._words_queued.appendleft(frag)
 
     def loop(self):
 
         def _enter_mode_code():
-            print ("ENTERED MODE CODE", end="\r\n")
+            log.info("ENTERED MODE CODE")
             desktop_notification('Voice entry mode: Code')
             self.current_mode = self.mode_code
             self.current_mode.switch_to()
 
         def _enter_mode_dictation():
-            print ("ENTERED MODE DICTATION", end="\r\n")
+            log.info("ENTERED MODE DICTATION")
             desktop_notification('Voice entry mode: Dictation')
             self.current_mode = self.mode_dictation
             self.current_mode.switch_to()
 
-        while True:
-            word = self.next_input_fragment()
-
-            # special handling of mode change command
-            if self.match_command(
-                word.lower(), {
-                    'mode': {
-                        'code': _enter_mode_code,
-                        'dictation': _enter_mode_dictation
-                    }
-                }
-            ):
-                continue
-
-            self.current_mode.parse(word)
-
-    def match_command(self, word, command_tree, strip_spaces_from_keypresses=False):
-        # Traverses command_tree seeing if the spoken commands
-        # can match. if so issue command keypresses, if not then push
-        # back the keys we have peeked at so they can be handled by other routines.
-        if word in command_tree:
-            if isinstance(command_tree[word], dict):
-                _space = self.next_input_fragment()
-                next_word = self.next_input_fragment()
-                if self.match_command(next_word.lower(), command_tree[word], strip_spaces_from_keypresses):
-                    return True
+        mode_commands = CommandTrie({
+            'mode': {
+                'code': _enter_mode_code,
+                'dictation': _enter_mode_dictation
+            }
+        })
+
+        try:
+            while True:
+                word = self.next_input_fragment()
+                if startup_timing is not None:
+                    mark_startup('first input')
+                if not word:
+                    # end of an utterance
+                    self.flush_keypresses()
+                    self.utterance += 1
+                    continue
+
+                # special handling of mode change command
+                if self.match_command(word.lower(), mode_commands):
+                    continue
+
+                if tracer is None:
+                    self.current_mode.parse(word)
+                else:
+                    start = monotonic()
+                    self.current_mode.parse(word)
+                    tracer.record('parse', start)
+        except StopIteration:
+            # end of input
+            pass
+        self.flush_keypresses()
+        if self.injector is not None:
+            self.injector.close()
+
+    def find_command(self, word, commands, allowed=None):
+        # Looks for the longest command in the CommandTrie commands that the
+        # spoken words match. words after the first are only peeked at, so
+        # nothing has to be pushed back on a miss; each is preceded by a
+        # separator fragment. if found (and allowed(action) says so) the
+        # words are consumed and the command's action returned, otherwise
+        # None. commands don't continue past the end of an utterance.
+        root = commands.root
+        if word not in root:
+            return None
+        action, children = root[word]
+        if children is None:
+            if allowed is not None and not allowed(action):
+                return None
+            return action
+        queued = self._words_queued
+        words_in = self._words_in
+        peeked = 0
+        matched = 0
+        try:
+            while children is not None:
+                if len(queued) > peeked:
+                    separator = queued[peeked]
                 else:
-                    self.push_back_fragment(next_word)
-                    self.push_back_fragment(_space)
-                    return False
-            elif isinstance(command_tree[word], basestring):
-                # matched a command finally! issue it
-                if strip_spaces_from_keypresses:
-                    cmd = command_tree[word].strip()
+                    separator = next(words_in)
+                    queued.append(separator)
+                if not separator:
+                    # the utterance ended
+                    break
+                if len(queued) > peeked + 1:
+                    following = queued[peeked + 1]
                 else:
-                    cmd = command_tree[word]
-                self.emit_keypresses(cmd)
-                return True
-            else:
-                # assume action is callable
-                command_tree[word]()
-                return True
+                    following = next(words_in)
+                    queued.append(following)
+                peeked += 2
+                node = children.get(following.lower()) if following else None
+                if node is None:
+                    break
+                next_action, children = node
+                if next_action is not None:
+                    action = next_action
+                    matched = peeked
+        except StopIteration:
+            # input ended part way through the command
+            pass
+        if action is None or (allowed is not None and not allowed(action)):
+            return None
+        while matched:
+            queued.popleft()
+            matched -= 1
+        return action
+
+    def match_command(self, word, commands):
+        # if the spoken words match a command in commands, issue the command
+        # keypresses or call its action.
+        if word not in commands.root:
+            # most words aren't commands. don't pay for the call
+            return False
+        action = self.find_command(word, commands)
+        if action is None:
+            return False
+        if isinstance(action, basestring):
+            # matched a command finally! issue it
+            self.emit_keypresses(action)
+        else:
+            # assume action is callable
+            action()
+        return True
 
-    def tap_key(self, char):
+    def tap_key(self, char, n=1):
         try:
-            self.kb.tap_key(char)
+            self.kb.tap_key(char, n)
         except KeyError:
             # error looking up keysym
             pass
@@ -509,52 +1615,103 @@ class Keypresser(object):
     #    self.kb.type_string(string)
 
     def emit_keypresses(self, keypresses):
-        print ("KEY: " + repr(keypresses), end='\r\n')
-        while len(keypresses) > 0:
-            if keypresses[:5] == '<Esc>':
-                self.kb.tap_key(self.kb.escape_key)
-                keypresses = keypresses[5:]
-            elif keypresses[:8] == '<Return>':
-                self.kb.tap_key(self.kb.return_key)
-                keypresses = keypresses[8:]
-            elif keypresses[:4] == '<BS>':
-                self.kb.tap_key(self.kb.backspace_key)
-                keypresses = keypresses[4:]
-            elif keypresses[:5] == '<Tab>':
-                self.kb.tap_key(self.kb.tab_key)
-                keypresses = keypresses[5:]
-            elif re.match(r'^<C\-(\w)>', keypresses):
-                char = re.match(r'^<C\-(\w)>', keypresses).groups()[0]
-                self.emit_modified(char, self.kb.control_key)
-                keypresses = keypresses[5:]
-            elif re.match(r'^<A\-(\w)>', keypresses):
-                char = re.match(r'^<A\-(\w)>', keypresses).groups()[0]
-                self.emit_modified(char, self.kb.alt_key)
-                keypresses = keypresses[5:]
-            elif re.match(r'^<Mod4\-(\w)>', keypresses):
-                char = re.match(r'^<Mod4\-(\w)>', keypresses).groups()[0]
-                self.emit_modified(char, self.kb.super_l_key)
-                keypresses = keypresses[8:]
-            elif re.match(r'^<F(\d+)>', keypresses):
-                num = re.match(r'^<F(\d+)>', keypresses).groups()[0]
-                self.kb.tap_key(self.kb.function_keys[int(num)])
-                keypresses = keypresses[3+len(num):]
-            elif keypresses[:4] == '<Up>':
-                self.kb.tap_key(self.kb.up_key)
-                keypresses = keypresses[4:]
-            elif keypresses[:6] == '<Down>':
-                self.kb.tap_key(self.kb.down_key)
-                keypresses = keypresses[6:]
-            elif keypresses[:6] == '<Left>':
-                self.kb.tap_key(self.kb.left_key)
-                keypresses = keypresses[6:]
-            elif keypresses[:7] == '<Right>':
-                self.kb.tap_key(self.kb.right_key)
-                keypresses = keypresses[7:]
+        # keypresses are injected at the end of the utterance, by flush_keypresses()
+        log.debug("KEY: {0!r}", keypresses)
+        events = parse_keypresses(keypresses)
+        self._plan.append(events)
+        self._track_typed(events)
+
+    def _track_typed(self, events):
+        typed = self.typed
+        for key, modifier, count in events:
+            if modifier is None and len(key) == 1 and key not in '\t\r\n':
+                typed += key * count
+            elif modifier is None and key == 'BS':
+                typed = typed[:-count]
+            elif key in ('\r', '\n', 'Return'):
+                # the start of a line, which deleting words stops at
+                typed = '\n'
+            else:
+                # moved the cursor, left insert mode, completed...
+                typed = ''
+        if len(typed) > 2 * self.TYPED_LENGTH:
+            typed = typed[-self.TYPED_LENGTH:]
+        self.typed = typed
+
+    def flush_keypresses(self):
+        """Injects the keypresses planned since the last flush, in one batch."""
+        if not self._plan:
+            return
+        plan, self._plan = self._plan, []
+        if self.injector is not None:
+            self.injector.put(plan)
+            return
+        if tracer is not None:
+            start = monotonic()
+        with self.keyboard().batch():
+            for events in plan:
+                self.emit_key_events(events)
+        if startup_timing is not None:
+            mark_startup('first key')
+        if tracer is not None:
+            tracer.record('emit', start)
+            tracer.record('input_to_key', tracer.input_time)
+
+    def emit_key_events(self, events):
+        """Injects (key, modifier, count) events, as made by parse_keypresses()."""
+        for key, modifier, count in events:
+            if modifier is not None:
+                for i in range(count):
+                    self.emit_modified(key, self.modifier_keys[modifier])
+            elif len(key) == 1:
+                self.tap_key(key, count)
             else:
-                self.tap_key(keypresses[0])
-                keypresses = keypresses[1:]
+                self.kb.tap_key(self.special_keys[key], count)
 
 if __name__ == '__main__':
-    kp = Keypresser()
+    import optparse
+    parser = optparse.OptionParser()
+    parser.add_option('--trace', metavar='FILE',
+                      help='record how long each stage of handling input takes, '
+                           'appending histograms to FILE (- for stderr) as JSON '
+                           'lines on SIGUSR1 and at exit')
+    parser.add_option('--pipeline', action='store_true',
+                      help='read input and inject keys on separate threads, '
+                           'so input is read while keys are still being typed')
+    parser.add_option('--target', type='choice', default='generic',
+                      choices=sorted(TARGET_PROFILES),
+                      help='what is being typed into, for quicker deletes: '
+                           'generic, readline or vim-insert [default: %default]')
+    parser.add_option('--backend', type='choice', default='system',
+                      choices=sorted(KEYBOARD_BACKENDS),
+                      help='what to type with: system (the X display) or null '
+                           '(nothing, to try glue without a display) [default: %default]')
+    parser.add_option('--undo-history', type='int', default=30, metavar='WORDS',
+                      help='how many words delete can go back [default: %default]')
+    parser.add_option('--timing', action='store_true',
+                      help='write how long starting up took, up to the first key '
+                           'typed, to stderr')
+    parser.add_option('-q', '--quiet', action='store_true',
+                      help='log nothing')
+    parser.add_option('--log-level', type='choice', default='debug',
+                      choices=['debug', 'info', 'warning'],
+                      help='only log messages of this level or higher [default: %default]')
+    parser.add_option('--log-json', action='store_true',
+                      help='log JSON lines instead of text')
+    options, args = parser.parse_args()
+    if options.undo_history < 1:
+        parser.error('--undo-history must be at least 1')
+    if options.timing:
+        startup_timing = {}
+        mark_startup('glue imported')
+    if options.quiet:
+        log.level = QUIET
+    else:
+        log.level = {'debug': DEBUG, 'info': INFO, 'warning': WARNING}[options.log_level]
+    log.json_lines = options.log_json
+    if options.trace:
+        enable_tracing(options.trace)
+
+    kp = Keypresser(pipeline=options.pipeline, target=options.target,
+                    undo_capacity=options.undo_history, backend=options.backend)
     kp.loop()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+An asyncio front-end for glue (python 3 only). Input comes from any number
+of asyncio StreamReaders: the terminal, and TCP or unix socket connections.
+Each is split into words on the event loop; the Keypresser, with the
+speech modes unchanged, runs on a single executor thread that parses the
+words and injects the keys, so the event loop never blocks on X.
+
+With --frames, socket connections send JSON lines, one utterance each:
+
+    {"text": "line parent of node equals none"}
+
+so nothing is lost to guessing where words end (see glue_client.py).
+
+Whatever is sent is typed into the X session, where it can run commands,
+so TCP listens on loopback unless told otherwise, and listening anywhere
+else needs --frames and --token-file: each frame must then carry the
+shared token, as {"text": ..., "token": ...}.
+
+usage: python3 glue_async.py [--tcp [HOST:]PORT] [--unix PATH] [--frames]
+                             [--token-file FILE] [--no-stdin]
+"""
+import asyncio
+import concurrent.futures
+import hmac
+import ipaddress
+import json
+import os
+import queue
+import sys
+
+import glue
+
+
+class AsyncKeypresser(object):
+    """
+    Feeds words from StreamReaders to a glue Keypresser running on its own
+    executor thread. Words from a single read of a source are queued
+    together, so sources read at the same time don't split each other's
+    words, and at most max_queued reads wait to be parsed.
+    """
+
+    def __init__(self, kb=None, max_queued=256, backend='system'):
+        self.kb = kb
+        self.backend = backend
+        self.keypresser = None
+        self._reads = queue.Queue(max_queued)
+        self._executor = concurrent.futures.ThreadPoolExecutor(1)
+        self._end = object()
+        # set when the keypresser has stopped, so nothing more is queued
+        self._stopped = False
+
+    def _fragments(self):
+        while True:
+            fragments = self._reads.get()
+            if fragments is self._end:
+                return
+            for fragment in fragments:
+                yield fragment
+
+    def _run_keypresser(self):
+        self.keypresser = glue.Keypresser(kb=self.kb, fragments=self._fragments(),
+                                          backend=self.backend)
+        self.keypresser.loop()
+
+    async def run(self):
+        """
+        Parses words and injects keys until stop() is called, or raises
+        what stopped the keypresser.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._run_keypresser)
+        finally:
+            # the keypresser has stopped, or run() was cancelled and it
+            # should. either way, let go of any reads waiting for room in
+            # the queue
+            self.close()
+
+    def _drain(self):
+        try:
+            while True:
+                self._reads.get_nowait()
+        except queue.Empty:
+            pass
+
+    async def _put(self, item):
+        if self._stopped:
+            return
+        try:
+            self._reads.put_nowait(item)
+        except queue.Full:
+            # the keypresser is behind. wait for it without blocking the loop
+            await asyncio.get_running_loop().run_in_executor(None, self._reads.put, item)
+
+    async def stop(self):
+        """Ends input, once the words already read have been handled."""
+        await self._put(self._end)
+
+    def close(self):
+        """
+        Ends input straight away, dropping the words not yet handled, so the
+        keypresser's thread finishes and doesn't hold up exiting.
+        """
+        self._stopped = True
+        while True:
+            try:
+                self._reads.put_nowait(self._end)
+                break
+            except queue.Full:
+                self._drain()
+        self._executor.shutdown(wait=False)
+
+    async def serve(self, reader, word_timeout=None):
+        """Reads words from reader until end of input."""
+        fragment_reader = glue.FragmentReader(word_timeout)
+        while True:
+            try:
+                data = await asyncio.wait_for(reader.read(4096), fragment_reader.timeout())
+            except asyncio.TimeoutError:
+                await self._put(fragment_reader.timed_out())
+                continue
+            if not data:
+                await self._put(fragment_reader.end())
+                return
+            fragments = fragment_reader.feed(data.decode('latin-1'))
+            if fragments:
+                await self._put(fragments)
+
+    async def serve_frames(self, reader, token=None):
+        """
+        Reads JSON lines frames, each {"text": ...} with a whole utterance,
+        from reader until end of input. With a token, each frame must have
+        it as "token", or the connection is dropped.
+        """
+        tokenizer = glue.WordTokenizer()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                frame = json.loads(line.decode('utf-8'))
+                text = frame['text']
+            except (ValueError, KeyError, TypeError):
+                frame = text = None
+            if token is not None and not token_matches(frame, token):
+                glue.log.warning('frame without the token, dropping the connection')
+                return
+            if not isinstance(text, str):
+                glue.log.warning('bad frame: {0!r}', line)
+                continue
+            if glue.tracer is not None:
+                glue.tracer.input_time = glue.monotonic()
+            # the bytes dragon would have typed, as input_word_generator() reads them
+            text = text.encode('utf-8').decode('latin-1')
+            await self._put(tokenizer.feed(text) + tokenizer.flush() + [''])
+
+
+def token_matches(frame, token):
+    """True if the frame carries the shared token."""
+    sent = frame.get('token') if isinstance(frame, dict) else None
+    if not isinstance(sent, str):
+        return False
+    return hmac.compare_digest(sent.encode('utf-8'), token.encode('utf-8'))
+
+
+def tcp_address(address):
+    """Splits [HOST:]PORT, the host defaulting to loopback."""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == 'localhost'
+
+
+async def stdin_reader():
+    """A StreamReader for the terminal, in cbreak mode."""
+    import tty
+    fd = sys.stdin.fileno()
+    if os.isatty(fd):
+        tty.setcbreak(fd)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+async def main(options):
+    keypresser = AsyncKeypresser(backend=options.backend)
+    running = asyncio.ensure_future(keypresser.run())
+    token = None
+    if options.token_file:
+        with open(options.token_file) as f:
+            token = f.read().strip()
+
+    async def serve_connection(reader, writer):
+        try:
+            if options.frames:
+                await keypresser.serve_frames(reader, token)
+            else:
+                await keypresser.serve(reader)
+        finally:
+            writer.close()
+
+    servers = []
+    if options.tcp:
+        host, port = tcp_address(options.tcp)
+        servers.append(await asyncio.start_server(serve_connection, host, port))
+    if options.unix:
+        servers.append(await asyncio.start_unix_server(serve_connection, options.unix))
+
+    async def serve_stdin():
+        await keypresser.serve(await stdin_reader())
+        if not servers:
+            await keypresser.stop()
+
+    waiting = [running]
+    if options.stdin:
+        waiting.append(asyncio.ensure_future(serve_stdin()))
+    try:
+        # until the keypresser stops, or fails (no display, say), when
+        # there's no point reading any more
+        await asyncio.wait(waiting, return_when=asyncio.FIRST_EXCEPTION)
+        if not running.done():
+            # reading the terminal failed
+            waiting[1].result()
+        await running
+    finally:
+        for task in waiting:
+            task.cancel()
+        for server in servers:
+            server.close()
+        keypresser.close()
+
+
+if __name__ == '__main__':
+    import optparse
+    parser = optparse.OptionParser(usage='%prog [--tcp [HOST:]PORT] [--unix PATH] [--frames] '
+                                         '[--token-file FILE] [--no-stdin]')
+    parser.add_option('--tcp', metavar='[HOST:]PORT',
+                      help='also read dictation from TCP connections to PORT on HOST '
+                           '(by default 127.0.0.1)')
+    parser.add_option('--unix', metavar='PATH',
+                      help='also read dictation from connections to the unix socket PATH')
+    parser.add_option('--frames', action='store_true',
+                      help='socket connections send JSON lines {"text": utterance} '
+                           'rather than raw keystrokes')
+    parser.add_option('--token-file', metavar='FILE',
+                      help='frames must carry the token in FILE as "token". needed to '
+                           'listen for TCP connections beyond loopback')
+    parser.add_option('--no-stdin', action='store_false', dest='stdin', default=True,
+                      help="don't read dictation from the terminal")
+    parser.add_option('--backend', type='choice', default='system',
+                      choices=sorted(glue.KEYBOARD_BACKENDS),
+                      help='what to type with: system (the X display) or null '
+                           '(nothing) [default: %default]')
+    parser.add_option('-q', '--quiet', action='store_true',
+                      help='log nothing')
+    options, args = parser.parse_args()
+    if not (options.stdin or options.tcp or options.unix):
+        parser.error('no input to read')
+    if options.token_file and not options.frames:
+        parser.error('--token-file needs --frames')
+    if options.tcp and not is_loopback(tcp_address(options.tcp)[0]) and not options.token_file:
+        parser.error('listening for TCP connections beyond loopback needs --frames and '
+                     '--token-file, as what is sent is typed into the X session')
+    if options.quiet:
+        glue.log.level = glue.QUIET
+
+    asyncio.run(main(options))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Sends utterances to glue_async.py --frames, standing in for the dragon
+side. Each argument, or each line of standard input if there are none, is
+sent as one utterance.
+
+usage: python glue_client.py (--tcp [HOST:]PORT | --unix PATH) [--token-file FILE] [utterance...]
+"""
+from __future__ import print_function
+
+import json
+import optparse
+import socket
+import sys
+
+
+def connect(options):
+    if options.unix:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(options.unix)
+        return sock
+    host, _, port = options.tcp.rpartition(':')
+    return socket.create_connection((host or '127.0.0.1', int(port)))
+
+
+def frame(utterance, token=None):
+    """The JSON lines frame for an utterance."""
+    message = {'text': utterance}
+    if token is not None:
+        message['token'] = token
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+def main():
+    parser = optparse.OptionParser(
+        usage='%prog (--tcp [HOST:]PORT | --unix PATH) [--token-file FILE] [utterance...]')
+    parser.add_option('--tcp', metavar='[HOST:]PORT',
+                      help='glue is listening on PORT on HOST (by default 127.0.0.1)')
+    parser.add_option('--unix', metavar='PATH', help='glue is listening on unix socket PATH')
+    parser.add_option('--token-file', metavar='FILE',
+                      help='send the token in FILE with each utterance')
+    options, utterances = parser.parse_args()
+    if not (options.tcp or options.unix):
+        parser.error('need --tcp or --unix')
+    token = None
+    if options.token_file:
+        with open(options.token_file) as f:
+            token = f.read().strip()
+
+    sock = connect(options)
+    try:
+        if utterances:
+            for utterance in utterances:
+                sock.sendall(frame(utterance, token))
+        else:
+            for line in iter(sys.stdin.readline, ''):
+                sock.sendall(frame(line.rstrip('\r\n'), token))
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# Generated by tools/generate_keysyms.py from python-xlib 0.33. Do not edit.
+"""
+Keysym names (as in Xlib.XK, without the XK_ prefix) and their keysyms, for
+the latin1-4, greek and miscellany groups.
+"""
+
+KEYSYMS = (
+    ('Alt_L', 0xffe9), ('Alt_R', 0xffea), ('BackSpace', 0xff08),
+    ('Begin', 0xff58), ('Break', 0xff6b), ('Cancel', 0xff69),
+    ('Caps_Lock', 0xffe5), ('Clear', 0xff0b), ('Control_L', 0xffe3),
+    ('Control_R', 0xffe4), ('Delete', 0xffff), ('Down', 0xff54),
+    ('Eisu_Shift', 0xff2f), ('Eisu_toggle', 0xff30), ('End', 0xff57),
+    ('Escape', 0xff1b), ('Execute', 0xff62), ('F1', 0xffbe), ('F10', 0xffc7),
+    ('F11', 0xffc8), ('F12', 0xffc9), ('F13', 0xffca), ('F14', 0xffcb),
+    ('F15', 0xffcc), ('F16', 0xffcd), ('F17', 0xffce), ('F18', 0xffcf),
+    ('F19', 0xffd0), ('F2', 0xffbf), ('F20', 0xffd1), ('F21', 0xffd2),
+    ('F22', 0xffd3), ('F23', 0xffd4), ('F24', 0xffd5), ('F25', 0xffd6),
+    ('F26', 0xffd7), ('F27', 0xffd8), ('F28', 0xffd9), ('F29', 0xffda),
+    ('F3', 0xffc0), ('F30', 0xffdb), ('F31', 0xffdc), ('F32', 0xffdd),
+    ('F33', 0xffde), ('F34', 0xffdf), ('F35', 0xffe0), ('F4', 0xffc1),
+    ('F5', 0xffc2), ('F6', 0xffc3), ('F7', 0xffc4), ('F8', 0xffc5),
+    ('F9', 0xffc6), ('Find', 0xff68), ('Hankaku', 0xff29), ('Help', 0xff6a),
+    ('Henkan', 0xff23), ('Henkan_Mode', 0xff23), ('Hiragana', 0xff25),
+    ('Hiragana_Katakana', 0xff27), ('Home', 0xff50), ('Hyper_L', 0xffed),
+    ('Hyper_R', 0xffee), ('Insert', 0xff63), ('KP_0', 0xffb0),
+    ('KP_1', 0xffb1), ('KP_2', 0xffb2), ('KP_3', 0xffb3), ('KP_4', 0xffb4),
+    ('KP_5', 0xffb5), ('KP_6', 0xffb6), ('KP_7', 0xffb7), ('KP_8', 0xffb8),
+    ('KP_9', 0xffb9), ('KP_Add', 0xffab), ('KP_Begin', 0xff9d),
+    ('KP_Decimal', 0xffae), ('KP_Delete', 0xff9f), ('KP_Divide', 0xffaf),
+    ('KP_Down', 0xff99), ('KP_End', 0xff9c), ('KP_Enter', 0xff8d),
+    ('KP_Equal', 0xffbd), ('KP_F1', 0xff91), ('KP_F2', 0xff92),
+    ('KP_F3', 0xff93), ('KP_F4', 0xff94), ('KP_Home', 0xff95),
+    ('KP_Insert', 0xff9e), ('KP_Left', 0xff96), ('KP_Multiply', 0xffaa),
+    ('KP_Next', 0xff9b), ('KP_Page_Down', 0xff9b), ('KP_Page_Up', 0xff9a),
+    ('KP_Prior', 0xff9a), ('KP_Right', 0xff98), ('KP_Separator', 0xffac),
+    ('KP_Space', 0xff80), ('KP_Subtract', 0xffad), ('KP_Tab', 0xff89),
+    ('KP_Up', 0xff97), ('Kana_Lock', 0xff2d), ('Kana_Shift', 0xff2e),
+    ('Kanji', 0xff21), ('Katakana', 0xff26), ('L1', 0xffc8), ('L10', 0xffd1),
+    ('L2', 0xffc9), ('L3', 0xffca), ('L4', 0xffcb), ('L5', 0xffcc),
+    ('L6', 0xffcd), ('L7', 0xffce), ('L8', 0xffcf), ('L9', 0xffd0),
+    ('Left', 0xff51), ('Linefeed', 0xff0a), ('Mae_Koho', 0xff3e),
+    ('Massyo', 0xff2c), ('Menu', 0xff67), ('Meta_L', 0xffe7),
+    ('Meta_R', 0xffe8), ('Mode_switch', 0xff7e), ('Muhenkan', 0xff22),
+    ('Multi_key', 0xff20), ('MultipleCandidate', 0xff3d), ('Next', 0xff56),
+    ('Num_Lock', 0xff7f), ('Page_Down', 0xff56), ('Page_Up', 0xff55),
+    ('Pause', 0xff13), ('PreviousCandidate', 0xff3e), ('Print', 0xff61),
+    ('Prior', 0xff55), ('R1', 0xffd2), ('R10', 0xffdb), ('R11', 0xffdc),
+    ('R12', 0xffdd), ('R13', 0xffde), ('R14', 0xffdf), ('R15', 0xffe0),
+    ('R2', 0xffd3), ('R3', 0xffd4), ('R4', 0xffd5), ('R5', 0xffd6),
+    ('R6', 0xffd7), ('R7', 0xffd8), ('R8', 0xffd9), ('R9', 0xffda),
+    ('Redo', 0xff66), ('Return', 0xff0d), ('Right', 0xff53),
+    ('Romaji', 0xff24), ('Scroll_Lock', 0xff14), ('Select', 0xff60),
+    ('Shift_L', 0xffe1), ('Shift_Lock', 0xffe6), ('Shift_R', 0xffe2),
+    ('SingleCandidate', 0xff3c), ('Super_L', 0xffeb), ('Super_R', 0xffec),
+    ('Sys_Req', 0xff15), ('Tab', 0xff09), ('Touroku', 0xff2b),
+    ('Undo', 0xff65), ('Up', 0xff52), ('Zen_Koho', 0xff3d),
+    ('Zenkaku', 0xff28), ('Zenkaku_Hankaku', 0xff2a),
+    ('script_switch', 0xff7e), ('0', 0x30), ('1', 0x31), ('2', 0x32),
+    ('3', 0x33), ('4', 0x34), ('5', 0x35), ('6', 0x36), ('7', 0x37),
+    ('8', 0x38), ('9', 0x39), ('A', 0x41), ('AE', 0xc6), ('Aacute', 0xc1),
+    ('Acircumflex', 0xc2), ('Adiaeresis', 0xc4), ('Agrave', 0xc0),
+    ('Aring', 0xc5), ('Atilde', 0xc3), ('B', 0x42), ('C', 0x43),
+    ('Ccedilla', 0xc7), ('D', 0x44), ('E', 0x45), ('ETH', 0xd0),
+    ('Eacute', 0xc9), ('Ecircumflex', 0xca), ('Ediaeresis', 0xcb),
+    ('Egrave', 0xc8), ('Eth', 0xd0), ('F', 0x46), ('G', 0x47), ('H', 0x48),
+    ('I', 0x49), ('Iacute', 0xcd), ('Icircumflex', 0xce), ('Idiaeresis', 0xcf),
+    ('Igrave', 0xcc), ('J', 0x4a), ('K', 0x4b), ('L', 0x4c), ('M', 0x4d),
+    ('N', 0x4e), ('Ntilde', 0xd1), ('O', 0x4f), ('Oacute', 0xd3),
+    ('Ocircumflex', 0xd4), ('Odiaeresis', 0xd6), ('Ograve', 0xd2),
+    ('Ooblique', 0xd8), ('Otilde', 0xd5), ('P', 0x50), ('Q', 0x51),
+    ('R', 0x52), ('S', 0x53), ('T', 0x54), ('THORN', 0xde), ('Thorn', 0xde),
+    ('U', 0x55), ('Uacute', 0xda), ('Ucircumflex', 0xdb), ('Udiaeresis', 0xdc),
+    ('Ugrave', 0xd9), ('V', 0x56), ('W', 0x57), ('X', 0x58), ('Y', 0x59),
+    ('Yacute', 0xdd), ('Z', 0x5a), ('a', 0x61), ('aacute', 0xe1),
+    ('acircumflex', 0xe2), ('acute', 0xb4), ('adiaeresis', 0xe4), ('ae', 0xe6),
+    ('agrave', 0xe0), ('ampersand', 0x26), ('apostrophe', 0x27),
+    ('aring', 0xe5), ('asciicircum', 0x5e), ('asciitilde', 0x7e),
+    ('asterisk', 0x2a), ('at', 0x40), ('atilde', 0xe3), ('b', 0x62),
+    ('backslash', 0x5c), ('bar', 0x7c), ('braceleft', 0x7b),
+    ('braceright', 0x7d), ('bracketleft', 0x5b), ('bracketright', 0x5d),
+    ('brokenbar', 0xa6), ('c', 0x63), ('ccedilla', 0xe7), ('cedilla', 0xb8),
+    ('cent', 0xa2), ('colon', 0x3a), ('comma', 0x2c), ('copyright', 0xa9),
+    ('currency', 0xa4), ('d', 0x64), ('degree', 0xb0), ('diaeresis', 0xa8),
+    ('division', 0xf7), ('dollar', 0x24), ('e', 0x65), ('eacute', 0xe9),
+    ('ecircumflex', 0xea), ('ediaeresis', 0xeb), ('egrave', 0xe8),
+    ('equal', 0x3d), ('eth', 0xf0), ('exclam', 0x21), ('exclamdown', 0xa1),
+    ('f', 0x66), ('g', 0x67), ('grave', 0x60), ('greater', 0x3e),
+    ('guillemotleft', 0xab), ('guillemotright', 0xbb), ('h', 0x68),
+    ('hyphen', 0xad), ('i', 0x69), ('iacute', 0xed), ('icircumflex', 0xee),
+    ('idiaeresis', 0xef), ('igrave', 0xec), ('j', 0x6a), ('k', 0x6b),
+    ('l', 0x6c), ('less', 0x3c), ('m', 0x6d), ('macron', 0xaf),
+    ('masculine', 0xba), ('minus', 0x2d), ('mu', 0xb5), ('multiply', 0xd7),
+    ('n', 0x6e), ('nobreakspace', 0xa0), ('notsign', 0xac), ('ntilde', 0xf1),
+    ('numbersign', 0x23), ('o', 0x6f), ('oacute', 0xf3), ('ocircumflex', 0xf4),
+    ('odiaeresis', 0xf6), ('ograve', 0xf2), ('onehalf', 0xbd),
+    ('onequarter', 0xbc), ('onesuperior', 0xb9), ('ordfeminine', 0xaa),
+    ('oslash', 0xf8), ('otilde', 0xf5), ('p', 0x70), ('paragraph', 0xb6),
+    ('parenleft', 0x28), ('parenright', 0x29), ('percent', 0x25),
+    ('period', 0x2e), ('periodcentered', 0xb7), ('plus', 0x2b),
+    ('plusminus', 0xb1), ('q', 0x71), ('question', 0x3f),
+    ('questiondown', 0xbf), ('quotedbl', 0x22), ('quoteleft', 0x60),
+    ('quoteright', 0x27), ('r', 0x72), ('registered', 0xae), ('s', 0x73),
+    ('section', 0xa7), ('semicolon', 0x3b), ('slash', 0x2f), ('space', 0x20),
+    ('ssharp', 0xdf), ('sterling', 0xa3), ('t', 0x74), ('thorn', 0xfe),
+    ('threequarters', 0xbe), ('threesuperior', 0xb3), ('twosuperior', 0xb2),
+    ('u', 0x75), ('uacute', 0xfa), ('ucircumflex', 0xfb), ('udiaeresis', 0xfc),
+    ('ugrave', 0xf9), ('underscore', 0x5f), ('v', 0x76), ('w', 0x77),
+    ('x', 0x78), ('y', 0x79), ('yacute', 0xfd), ('ydiaeresis', 0xff),
+    ('yen', 0xa5), ('z', 0x7a), ('Abreve', 0x1c3), ('Aogonek', 0x1a1),
+    ('Cacute', 0x1c6), ('Ccaron', 0x1c8), ('Dcaron', 0x1cf),
+    ('Dstroke', 0x1d0), ('Ecaron', 0x1cc), ('Eogonek', 0x1ca),
+    ('Lacute', 0x1c5), ('Lcaron', 0x1a5), ('Lstroke', 0x1a3),
+    ('Nacute', 0x1d1), ('Ncaron', 0x1d2), ('Odoubleacute', 0x1d5),
+    ('Racute', 0x1c0), ('Rcaron', 0x1d8), ('Sacute', 0x1a6), ('Scaron', 0x1a9),
+    ('Scedilla', 0x1aa), ('Tcaron', 0x1ab), ('Tcedilla', 0x1de),
+    ('Udoubleacute', 0x1db), ('Uring', 0x1d9), ('Zabovedot', 0x1af),
+    ('Zacute', 0x1ac), ('Zcaron', 0x1ae), ('abovedot', 0x1ff),
+    ('abreve', 0x1e3), ('aogonek', 0x1b1), ('breve', 0x1a2), ('cacute', 0x1e6),
+    ('caron', 0x1b7), ('ccaron', 0x1e8), ('dcaron', 0x1ef),
+    ('doubleacute', 0x1bd), ('dstroke', 0x1f0), ('ecaron', 0x1ec),
+    ('eogonek', 0x1ea), ('lacute', 0x1e5), ('lcaron', 0x1b5),
+    ('lstroke', 0x1b3), ('nacute', 0x1f1), ('ncaron', 0x1f2),
+    ('odoubleacute', 0x1f5), ('ogonek', 0x1b2), ('racute', 0x1e0),
+    ('rcaron', 0x1f8), ('sacute', 0x1b6), ('scaron', 0x1b9),
+    ('scedilla', 0x1ba), ('tcaron', 0x1bb), ('tcedilla', 0x1fe),
+    ('udoubleacute', 0x1fb), ('uring', 0x1f9), ('zabovedot', 0x1bf),
+    ('zacute', 0x1bc), ('zcaron', 0x1be), ('Cabovedot', 0x2c5),
+    ('Ccircumflex', 0x2c6), ('Gabovedot', 0x2d5), ('Gbreve', 0x2ab),
+    ('Gcircumflex', 0x2d8), ('Hcircumflex', 0x2a6), ('Hstroke', 0x2a1),
+    ('Iabovedot', 0x2a9), ('Jcircumflex', 0x2ac), ('Scircumflex', 0x2de),
+    ('Ubreve', 0x2dd), ('cabovedot', 0x2e5), ('ccircumflex', 0x2e6),
+    ('gabovedot', 0x2f5), ('gbreve', 0x2bb), ('gcircumflex', 0x2f8),
+    ('hcircumflex', 0x2b6), ('hstroke', 0x2b1), ('idotless', 0x2b9),
+    ('jcircumflex', 0x2bc), ('scircumflex', 0x2fe), ('ubreve', 0x2fd),
+    ('Amacron', 0x3c0), ('ENG', 0x3bd), ('Eabovedot', 0x3cc),
+    ('Emacron', 0x3aa), ('Gcedilla', 0x3ab), ('Imacron', 0x3cf),
+    ('Iogonek', 0x3c7), ('Itilde', 0x3a5), ('Kcedilla', 0x3d3),
+    ('Lcedilla', 0x3a6), ('Ncedilla', 0x3d1), ('Omacron', 0x3d2),
+    ('Rcedilla', 0x3a3), ('Tslash', 0x3ac), ('Umacron', 0x3de),
+    ('Uogonek', 0x3d9), ('Utilde', 0x3dd), ('amacron', 0x3e0),
+    ('eabovedot', 0x3ec), ('emacron', 0x3ba), ('eng', 0x3bf),
+    ('gcedilla', 0x3bb), ('imacron', 0x3ef), ('iogonek', 0x3e7),
+    ('itilde', 0x3b5), ('kappa', 0x3a2), ('kcedilla', 0x3f3), ('kra', 0x3a2),
+    ('lcedilla', 0x3b6), ('ncedilla', 0x3f1), ('omacron', 0x3f2),
+    ('rcedilla', 0x3b3), ('tslash', 0x3bc), ('umacron', 0x3fe),
+    ('uogonek', 0x3f9), ('utilde', 0x3fd), ('Greek_ALPHA', 0x7c1),
+    ('Greek_ALPHAaccent', 0x7a1), ('Greek_BETA', 0x7c2), ('Greek_CHI', 0x7d7),
+    ('Greek_DELTA', 0x7c4), ('Greek_EPSILON', 0x7c5),
+    ('Greek_EPSILONaccent', 0x7a2), ('Greek_ETA', 0x7c7),
+    ('Greek_ETAaccent', 0x7a3), ('Greek_GAMMA', 0x7c3), ('Greek_IOTA', 0x7c9),
+    ('Greek_IOTAaccent', 0x7a4), ('Greek_IOTAdiaeresis', 0x7a5),
+    ('Greek_KAPPA', 0x7ca), ('Greek_LAMBDA', 0x7cb), ('Greek_LAMDA', 0x7cb),
+    ('Greek_MU', 0x7cc), ('Greek_NU', 0x7cd), ('Greek_OMEGA', 0x7d9),
+    ('Greek_OMEGAaccent', 0x7ab), ('Greek_OMICRON', 0x7cf),
+    ('Greek_OMICRONaccent', 0x7a7), ('Greek_PHI', 0x7d6), ('Greek_PI', 0x7d0),
+    ('Greek_PSI', 0x7d8), ('Greek_RHO', 0x7d1), ('Greek_SIGMA', 0x7d2),
+    ('Greek_TAU', 0x7d4), ('Greek_THETA', 0x7c8), ('Greek_UPSILON', 0x7d5),
+    ('Greek_UPSILONaccent', 0x7a8), ('Greek_UPSILONdieresis', 0x7a9),
+    ('Greek_XI', 0x7ce), ('Greek_ZETA', 0x7c6),
+    ('Greek_accentdieresis', 0x7ae), ('Greek_alpha', 0x7e1),
+    ('Greek_alphaaccent', 0x7b1), ('Greek_beta', 0x7e2), ('Greek_chi', 0x7f7),
+    ('Greek_delta', 0x7e4), ('Greek_epsilon', 0x7e5),
+    ('Greek_epsilonaccent', 0x7b2), ('Greek_eta', 0x7e7),
+    ('Greek_etaaccent', 0x7b3), ('Greek_finalsmallsigma', 0x7f3),
+    ('Greek_gamma', 0x7e3), ('Greek_horizbar', 0x7af), ('Greek_iota', 0x7e9),
+    ('Greek_iotaaccent', 0x7b4), ('Greek_iotaaccentdieresis', 0x7b6),
+    ('Greek_iotadieresis', 0x7b5), ('Greek_kappa', 0x7ea),
+    ('Greek_lambda', 0x7eb), ('Greek_lamda', 0x7eb), ('Greek_mu', 0x7ec),
+    ('Greek_nu', 0x7ed), ('Greek_omega', 0x7f9), ('Greek_omegaaccent', 0x7bb),
+    ('Greek_omicron', 0x7ef), ('Greek_omicronaccent', 0x7b7),
+    ('Greek_phi', 0x7f6), ('Greek_pi', 0x7f0), ('Greek_psi', 0x7f8),
+    ('Greek_rho', 0x7f1), ('Greek_sigma', 0x7f2), ('Greek_switch', 0xff7e),
+    ('Greek_tau', 0x7f4), ('Greek_theta', 0x7e8), ('Greek_upsilon', 0x7f5),
+    ('Greek_upsilonaccent', 0x7b8), ('Greek_upsilonaccentdieresis', 0x7ba),
+    ('Greek_upsilondieresis', 0x7b9), ('Greek_xi', 0x7ee),
+    ('Greek_zeta', 0x7e6),
+)
+
+STRING_TO_KEYSYM = dict(KEYSYMS)
+KEYSYM_TO_STRING = dict((keysym, string) for string, keysym in KEYSYMS)
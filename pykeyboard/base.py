@@ -19,12 +19,19 @@ framework to be extended by each platform.
 """
 
 import time
+from contextlib import contextmanager
 from threading import Thread
 
 
 class PyKeyboardMeta(object):
     """
     The base class for PyKeyboard. Represents basic operational model.
+
+    Anything glue types with implements press_key, release_key, tap_key,
+    batch and flush, and has the special key attributes it uses
+    (escape_key, return_key, backspace_key, tab_key, the arrow keys,
+    control_key, alt_key, super_l_key and function_keys). Besides each
+    platform's PyKeyboard, recording.py has keyboards that inject nothing.
     """
 
     def press_key(self, character=''):
@@ -40,7 +47,22 @@ class PyKeyboardMeta(object):
         for i in range(n):
             self.press_key(character)
             self.release_key(character)
-            time.sleep(interval)
+            if interval:
+                time.sleep(interval)
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups the key events sent within a with block, so that platforms
+        able to do so can send them to the system together at the end of the
+        block rather than one at a time. Blocks may be nested; the events are
+        sent when the outermost one ends.
+        """
+        yield
+
+    def flush(self):
+        """Sends any key events not yet passed on to the system."""
+        pass
 
     def type_string(self, char_string, interval=0):
         """
@@ -0,0 +1,106 @@
+"""
+Keyboards that don't inject key events anywhere, so glue can be run, tested
+and benchmarked without a display: NullKeyboard drops the events, and
+RecordingKeyboard keeps them to be looked at afterwards.
+"""
+
+import time
+from array import array
+from contextlib import contextmanager
+
+from .base import PyKeyboardMeta
+
+# the key attributes glue uses, and the names they are given
+KEY_NAMES = {
+    'escape_key': 'Escape',
+    'return_key': 'Return',
+    'backspace_key': 'BackSpace',
+    'tab_key': 'Tab',
+    'up_key': 'Up',
+    'down_key': 'Down',
+    'left_key': 'Left',
+    'right_key': 'Right',
+    'control_key': 'Control_L',
+    'alt_key': 'Alt_L',
+    'super_l_key': 'Super_L',
+    'shift_key': 'Shift_L',
+}
+
+
+class NullKeyboard(PyKeyboardMeta):
+    """A PyKeyboard that sends key events nowhere."""
+
+    def __init__(self):
+        self.special_key_assignment()
+
+    def press_key(self, character=''):
+        pass
+
+    def release_key(self, character=''):
+        pass
+
+    def tap_key(self, character='', n=1, interval=0):
+        pass
+
+    def special_key_assignment(self):
+        for attr, name in KEY_NAMES.items():
+            setattr(self, attr, name)
+        self.function_keys = [None] + ['F{0}'.format(i) for i in range(1, 36)]
+
+
+class RecordingKeyboard(NullKeyboard):
+    """
+    A PyKeyboard that records key events instead of injecting them. Each key
+    seen is numbered by its position in keys, from 1, and events holds the
+    number of each key pressed and the negated number of each key released,
+    so recording an event is an append to an array of ints.
+    """
+
+    def __init__(self):
+        NullKeyboard.__init__(self)
+        self.keys = []
+        self._key_numbers = {}
+        self.events = array('i')
+        # with blocks entered, nested or not
+        self.batches = 0
+
+    def _key_number(self, character):
+        number = self._key_numbers.get(character)
+        if number is None:
+            self.keys.append(character)
+            number = self._key_numbers[character] = len(self.keys)
+        return number
+
+    def press_key(self, character=''):
+        self.events.append(self._key_number(character))
+
+    def release_key(self, character=''):
+        self.events.append(-self._key_number(character))
+
+    def tap_key(self, character='', n=1, interval=0):
+        number = self._key_number(character)
+        if not interval:
+            self.events.extend((number, -number) * n)
+            return
+        for i in range(n):
+            self.events.extend((number, -number))
+            time.sleep(interval)
+
+    @contextmanager
+    def batch(self):
+        self.batches += 1
+        yield
+
+    def recorded(self):
+        """Yields the events recorded as (pressed, key) pairs."""
+        keys = self.keys
+        for number in self.events:
+            if number > 0:
+                yield True, keys[number - 1]
+            else:
+                yield False, keys[-number - 1]
+
+    def clear(self):
+        """Forgets the events recorded so far."""
+        del self.events[:]
+        self.batches = 0
@@ -18,12 +18,13 @@ from Xlib import X
 from Xlib.ext.xtest import fake_input
 from Xlib.ext import record
 from Xlib.protocol import rq
-import Xlib.XK
 
 from .base import PyKeyboardMeta, PyKeyboardEventMeta
+from ._keysyms import KEYSYM_TO_STRING, STRING_TO_KEYSYM
 
 import time
 import string
+from contextlib import contextmanager
 
 special_X_keysyms = {
     ' ': "space",
@@ -72,8 +73,19 @@ class PyKeyboard(PyKeyboardMeta):
     """
     def __init__(self, display=None):
         PyKeyboardMeta.__init__(self)
+        #A single connection does for injecting; only PyKeyboardEvent needs
+        #a second one, for recording
         self.display = Display(display)
-        self.display2 = Display(display)
+        if not self.display.has_extension('XTEST'):
+            raise RuntimeError('The X server {0} does not support the XTEST '
+                               'extension, needed to fake key presses'.format(
+                                   self.display.get_display_name()))
+        #Nesting depth of batch() blocks; events are only synced outside them
+        self._batch_depth = 0
+        #Whether a batch is holding Shift down over a run of shifted characters
+        self._shift_held = False
+        #Maps characters to (keycode, needs shift), until the mapping changes
+        self._key_cache = {}
         self.special_key_assignment()
 
     def press_key(self, character=''):
@@ -81,16 +93,26 @@ class PyKeyboard(PyKeyboardMeta):
         Press a given character key. Also works with character keycodes as
         integers, but not keysyms.
         """
+        if not self._batch_depth:
+            self.check_mapping_changes()
         try:  # Detect uppercase or shifted character
-            shifted = self.is_char_shifted(character)
+            keycode, shifted = self.lookup_character_key(character)
         except AttributeError:  # Handle the case of integer keycode argument
+            #Special keys and modifiers mean what they say, without Shift
+            self._release_held_shift()
             fake_input(self.display, X.KeyPress, character)
-            self.display.sync()
         else:
-            if shifted:
+            if self._batch_depth:
+                #Hold Shift over runs of shifted characters, as type_string does
+                if shifted and not self._shift_held:
+                    fake_input(self.display, X.KeyPress, self.shift_key)
+                    self._shift_held = True
+                elif not shifted:
+                    self._release_held_shift()
+            elif shifted:
                 fake_input(self.display, X.KeyPress, self.shift_key)
-            keycode = self.lookup_character_keycode(character)
             fake_input(self.display, X.KeyPress, keycode)
+        if not self._batch_depth:
             self.display.sync()
 
     def release_key(self, character=''):
@@ -99,17 +121,56 @@ class PyKeyboard(PyKeyboardMeta):
         integers, but not keysyms.
         """
         try:  # Detect uppercase or shifted character
-            shifted = self.is_char_shifted(character)
+            keycode, shifted = self.lookup_character_key(character)
         except AttributeError:  # Handle the case of integer keycode argument
             fake_input(self.display, X.KeyRelease, character)
-            self.display.sync()
         else:
-            if shifted:
+            if shifted and not self._batch_depth:
                 fake_input(self.display, X.KeyRelease, self.shift_key)
-            keycode = self.lookup_character_keycode(character)
             fake_input(self.display, X.KeyRelease, keycode)
+        if not self._batch_depth:
             self.display.sync()
 
+    def _release_held_shift(self):
+        if self._shift_held:
+            fake_input(self.display, X.KeyRelease, self.shift_key)
+            self._shift_held = False
+
+    def tap_key(self, character='', n=1, interval=0):
+        """
+        Press and release a given character key n times. Without an interval,
+        the events are sent with a single sync at the end.
+        """
+        if interval:
+            return PyKeyboardMeta.tap_key(self, character, n, interval)
+        with self.batch():
+            for i in range(n):
+                self.press_key(character)
+                self.release_key(character)
+
+    @contextmanager
+    def batch(self):
+        """
+        Queues the XTEST events of the key methods called within a with
+        block, and syncs with the X server once at its end, instead of after
+        every press and release. Shift is held down over runs of shifted
+        characters, rather than pressed and released for each.
+        """
+        if not self._batch_depth:
+            self.check_mapping_changes()
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._release_held_shift()
+                self.display.sync()
+
+    def flush(self):
+        """Sends queued events to the X server without waiting for it."""
+        self.display.flush()
+
     def special_key_assignment(self):
         """
         Determines the keycodes for common special keys on the keyboard. These
@@ -218,11 +279,37 @@ class PyKeyboard(PyKeyboardMeta):
         Looks up the keysym for the character then returns the keycode mapping
         for that keysym.
         """
-        keysym = Xlib.XK.string_to_keysym(character)
+        keysym = STRING_TO_KEYSYM.get(character, 0)
         if keysym == 0:
-            keysym = Xlib.XK.string_to_keysym(special_X_keysyms[character])
+            keysym = STRING_TO_KEYSYM.get(special_X_keysyms[character], 0)
         return self.display.keysym_to_keycode(keysym)
 
+    def lookup_character_key(self, character):
+        """
+        Returns the keycode for the character and whether Shift is needed to
+        type it, from a cache filled as characters are first typed. Raises
+        AttributeError for an integer keycode.
+        """
+        try:
+            return self._key_cache[character]
+        except KeyError:
+            shifted = self.is_char_shifted(character)
+            key = (self.lookup_character_keycode(character), shifted)
+            self._key_cache[character] = key
+            return key
+
+    def check_mapping_changes(self):
+        """
+        Handles any MappingNotify events the X server has sent since the last
+        check, which mean that keycodes may have moved: the display's keymap
+        is refreshed and our cache of character keycodes dropped.
+        """
+        while self.display.pending_events():
+            event = self.display.next_event()
+            if event.type == X.MappingNotify:
+                self.display.refresh_keyboard_mapping(event)
+                self._key_cache.clear()
+
 
 class PyKeyboardEvent(PyKeyboardEventMeta):
     """
@@ -490,20 +577,9 @@ class PyKeyboardEvent(PyKeyboardEventMeta):
         Returns dictionaries for the translation of keysyms to strings and from
         strings to keysyms.
         """
-        keysym_to_string_dict = {}
-        string_to_keysym_dict = {}
-        #XK loads latin1 and miscellany on its own; load latin2-4 and greek
-        Xlib.XK.load_keysym_group('latin2')
-        Xlib.XK.load_keysym_group('latin3')
-        Xlib.XK.load_keysym_group('latin4')
-        Xlib.XK.load_keysym_group('greek')
-
-        #Make a standard dict and the inverted dict
-        for string, keysym in Xlib.XK.__dict__.items():
-            if string.startswith('XK_'):
-                string_to_keysym_dict[string[3:]] = keysym
-                keysym_to_string_dict[keysym] = string[3:]
-        return keysym_to_string_dict, string_to_keysym_dict
+        #Generated from Xlib.XK by tools/generate_keysyms.py, rather than
+        #loading the keysym groups and walking Xlib.XK every time
+        return KEYSYM_TO_STRING, STRING_TO_KEYSYM
 
     def ascii_printable(self, keysym):
         """
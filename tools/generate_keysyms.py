@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Generates pykeyboard/_keysyms.py, the keysym <-> string tables the X11
+PyKeyboard and PyKeyboardEvent use, from python-xlib's Xlib.XK, so they
+don't have to load the keysym groups and build the tables at startup.
+Rerun it when python-xlib adds keysyms.
+
+usage: python tools/generate_keysyms.py [--check]
+
+With --check, nothing is written; instead the generated tables are compared
+with ones built from Xlib.XK as it is installed now, exiting 1 if they
+differ.
+"""
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Xlib
+import Xlib.XK
+
+# loaded on top of latin1 and miscellany, which Xlib.XK loads itself
+KEYSYM_GROUPS = ('latin2', 'latin3', 'latin4', 'greek')
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'pykeyboard', '_keysyms.py')
+
+HEADER = '''\
+# Generated by tools/generate_keysyms.py from python-xlib {version}. Do not edit.
+"""
+Keysym names (as in Xlib.XK, without the XK_ prefix) and their keysyms, for
+the latin1-4, greek and miscellany groups.
+"""
+
+KEYSYMS = (
+'''
+
+FOOTER = '''\
+)
+
+STRING_TO_KEYSYM = dict(KEYSYMS)
+KEYSYM_TO_STRING = dict((keysym, string) for string, keysym in KEYSYMS)
+'''
+
+
+def runtime_keysyms():
+    """The (name, keysym) pairs of Xlib.XK, in the order it defines them."""
+    for group in KEYSYM_GROUPS:
+        Xlib.XK.load_keysym_group(group)
+    return [(string[3:], keysym) for string, keysym in Xlib.XK.__dict__.items()
+            if string.startswith('XK_')]
+
+
+def generate(keysyms):
+    lines = []
+    line = '   '
+    for string, keysym in keysyms:
+        item = " ({0!r}, 0x{1:x}),".format(str(string), keysym)
+        if len(line) + len(item) > 79:
+            lines.append(line)
+            line = '   '
+        line += item
+    lines.append(line)
+    version = '.'.join(str(part) for part in Xlib.__version__)
+    return HEADER.format(version=version) + '\n'.join(lines) + '\n' + FOOTER
+
+
+def check(keysyms):
+    """Returns a list of differences between the generated and runtime tables."""
+    from pykeyboard import _keysyms
+    string_to_keysym = dict(keysyms)
+    problems = []
+    for string in sorted(set(string_to_keysym) | set(_keysyms.STRING_TO_KEYSYM)):
+        if string_to_keysym.get(string) != _keysyms.STRING_TO_KEYSYM.get(string):
+            problems.append('{0}: {1!r} generated, {2!r} at runtime'.format(
+                string, _keysyms.STRING_TO_KEYSYM.get(string), string_to_keysym.get(string)))
+    # several names can share a keysym; any of them will do
+    for keysym, string in _keysyms.KEYSYM_TO_STRING.items():
+        if string_to_keysym.get(string) != keysym:
+            problems.append('keysym 0x{0:x} named {1}'.format(keysym, string))
+    return problems
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [--check]')
+    parser.add_option('--check', action='store_true',
+                      help='compare the generated tables with Xlib.XK instead of writing them')
+    options, args = parser.parse_args()
+
+    keysyms = runtime_keysyms()
+    if options.check:
+        problems = check(keysyms)
+        for problem in problems:
+            print(problem)
+        print('{0} keysyms, {1} differences'.format(len(keysyms), len(problems)))
+        sys.exit(1 if problems else 0)
+
+    with open(MODULE_PATH, 'w') as f:
+        f.write(generate(keysyms))
+    print('wrote {0} keysyms to {1}'.format(len(keysyms), os.path.normpath(MODULE_PATH)))
+
+
+if __name__ == '__main__':
+    main()